@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the adaptive (streaming quantile) thresholds.
+
+Compares the P-squared sketch against the exact np.percentile on a synthetic
+game's relative energy, then runs the exact and adaptive threshold modes on
+games whose crowd gets louder at halftime and counts how many of the truly
+biggest roars (the highest gain over the crowd) each mode selects.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from scipy.signal import butter, sosfilt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "audio_highlights"))
+
+from audio_processing import (  # noqa: E402
+    ADAPTIVE_BASELINE_SECONDS,
+    ADAPTIVE_ENERGY_QUANTILE,
+    AUDIO_PROFILES,
+    P2Quantile,
+    RollingBaseline,
+    compute_window_features,
+)
+from bench_audio_profiles import write_wav  # noqa: E402
+from highlight_extractor import HighlightExtractor  # noqa: E402
+
+SAMPLE_RATE = AUDIO_PROFILES['full']['sample_rate']
+
+
+def synthesize_game(duration, seed=0, crowd_shift=1.0):
+    """
+    Drifting crowd noise with roars every ~75 s, the crowd `crowd_shift` times louder
+    after halftime.
+
+    Returns:
+        tuple: (samples, roar start times, roar gains over the crowd)
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = duration * SAMPLE_RATE
+    t = np.arange(n_samples) / SAMPLE_RATE
+
+    level = 0.03 * (1.5 + np.sin(2 * np.pi * t / 300))
+    level[t >= duration / 2] *= crowd_shift
+    samples = sosfilt(butter(1, 1000, fs=SAMPLE_RATE, output='sos'), rng.normal(0, 1, n_samples)) * level
+
+    roar_times = np.arange(40, duration - 40, 75.0) + rng.uniform(-5, 5)
+    roar_gains = rng.uniform(2, 5, len(roar_times))
+    for roar_time, gain in zip(roar_times, roar_gains):
+        start, end = int(roar_time * SAMPLE_RATE), int((roar_time + 3) * SAMPLE_RATE)
+        samples[start:end] *= gain
+
+    return np.clip(samples, -1, 1), roar_times, roar_gains
+
+
+def sketch_accuracy(samples):
+    """P-squared against np.percentile on the relative energy of one game."""
+    frame_length, hop_length = int(SAMPLE_RATE * 0.5), int(SAMPLE_RATE * 0.1)
+    frame_starts = np.arange(0, len(samples) - frame_length, hop_length)
+    energy, _ = compute_window_features(samples, SAMPLE_RATE, frame_length, frame_starts)
+    energy_db = 20 * np.log10(energy + 1e-10)
+
+    baseline = RollingBaseline(ADAPTIVE_BASELINE_SECONDS, hop_length / SAMPLE_RATE)
+    relative_db = np.array([baseline.update(value) for value in energy_db])
+
+    print(f"\nQuantile sketch on {len(relative_db)} windows of relative energy")
+    print(f"{'quantile':>8} {'exact dB':>9} {'P2 dB':>8} {'rank error':>11} {'us/update':>10}")
+    for p in (0.5, 0.9, ADAPTIVE_ENERGY_QUANTILE, 0.99):
+        sketch = P2Quantile(p)
+        start = time.perf_counter()
+        for value in relative_db:
+            sketch.update(value)
+        per_update = (time.perf_counter() - start) / len(relative_db) * 1e6
+
+        exact = np.percentile(relative_db, p * 100)
+        rank_error = np.mean(relative_db <= sketch.value()) - p
+        print(f"{p:>8.2f} {exact:>9.2f} {sketch.value():>8.2f} {rank_error:>+11.4f} {per_update:>10.1f}")
+
+    print(f"Memory: 5 markers vs {relative_db.nbytes / 1e6:.1f} MB of stored windows")
+
+
+def top_roar_overlap(audio_path, output_dir, roar_times, roar_gains, num_highlights, threshold_mode):
+    """How many of the selected highlights are among the num_highlights biggest roars."""
+    extractor = HighlightExtractor("synthetic", num_highlights=num_highlights, output_dir=output_dir,
+                                   threshold_mode=threshold_mode)
+    extractor.audio_path = audio_path
+    extractor.analyze_audio()
+    extractor.cleanup()
+
+    biggest = set(np.argsort(roar_gains)[-num_highlights:])
+    picked = {int(np.argmin(np.abs(roar_times - t))) for t in extractor.highlight_timestamps['time']}
+    return len(picked & biggest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the adaptive threshold mode.")
+    parser.add_argument("--duration", type=int, default=1200, help="Length of the synthetic games in seconds")
+    parser.add_argument("--num_highlights", type=int, default=8, help="Number of highlights to compare")
+    parser.add_argument("--seeds", type=int, default=3, help="Number of synthetic games per crowd shift")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        sketch_accuracy(synthesize_game(args.duration)[0])
+
+        rows = []
+        for crowd_shift in (1.0, 2.0, 4.0):
+            for seed in range(args.seeds):
+                samples, roar_times, roar_gains = synthesize_game(args.duration, seed, crowd_shift)
+                audio_path = os.path.join(temp_dir, "game.wav")
+                write_wav(audio_path, samples, SAMPLE_RATE)
+                overlaps = [
+                    top_roar_overlap(audio_path, os.path.join(temp_dir, mode), roar_times, roar_gains,
+                                     args.num_highlights, mode)
+                    for mode in ("exact", "adaptive")
+                ]
+                rows.append((crowd_shift, seed, *overlaps))
+    finally:
+        shutil.rmtree(temp_dir)
+
+    print(f"\nBiggest-roar overlap of the top {args.num_highlights} highlights")
+    print(f"{'crowd shift':>11} {'seed':>5} {'exact':>6} {'adaptive':>9}")
+    for crowd_shift, seed, exact, adaptive in rows:
+        print(f"{crowd_shift:>10.0f}x {seed:>5} {exact:>6} {adaptive:>9}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the audio decoding/feature profiles.
+
+Synthesizes a game soundtrack at 22050 Hz, resamples it to each profile's
+sample rate (standing in for the ffmpeg decode) and compares feature time,
+WAV size and the selected highlights of every profile against "full".
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+from scipy.signal import butter, resample_poly, sosfilt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "audio_highlights"))
+
+from audio_processing import AUDIO_PROFILES, compute_window_features, load_wav_samples  # noqa: E402
+from highlight_extractor import HighlightExtractor  # noqa: E402
+
+SOURCE_RATE = 22050
+
+
+def synthesize_game(duration, seed=0):
+    """Low-passed crowd noise with roars every ~75 s and a referee whistle (3 kHz) every ~4 min."""
+    rng = np.random.default_rng(seed)
+    n_samples = duration * SOURCE_RATE
+    t = np.arange(n_samples) / SOURCE_RATE
+
+    # Crowd noise: most energy below ~1 kHz, level drifting over the game
+    crowd = sosfilt(butter(1, 1000, fs=SOURCE_RATE, output='sos'), rng.normal(0, 1, n_samples))
+    samples = crowd * 0.05 * (1.5 + np.sin(2 * np.pi * t / 300))
+
+    for roar_time in np.arange(40, duration - 40, 75.0) + rng.uniform(-5, 5):
+        start, end = int(roar_time * SOURCE_RATE), int((roar_time + 3) * SOURCE_RATE)
+        samples[start:end] *= rng.uniform(3, 8)
+
+    for whistle_time in np.arange(100, duration - 10, 240.0):
+        start, end = int(whistle_time * SOURCE_RATE), int((whistle_time + 1) * SOURCE_RATE)
+        samples[start:end] += 0.5 * np.sin(2 * np.pi * 3000 * t[start:end])
+
+    return np.clip(samples, -1, 1)
+
+
+def write_wav(path, samples, frame_rate):
+    """Write mono float samples as a 16-bit PCM WAV file."""
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(frame_rate)
+        wav_file.writeframes((samples * 32767).astype(np.int16).tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the audio decoding/feature profiles.")
+    parser.add_argument("--duration", type=int, default=1800, help="Length of the synthetic game in seconds")
+    parser.add_argument("--num_highlights", type=int, default=10, help="Number of highlights to compare")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        source = synthesize_game(args.duration)
+        results = {}
+
+        for name, profile in AUDIO_PROFILES.items():
+            rate = profile['sample_rate']
+            audio_path = os.path.join(temp_dir, f"{name}.wav")
+            write_wav(audio_path, resample_poly(source, rate, SOURCE_RATE) if rate != SOURCE_RATE else source, rate)
+
+            samples, frame_rate = load_wav_samples(audio_path)
+            frame_length, hop_length = int(frame_rate * 0.5), int(frame_rate * 0.1)
+            frame_starts = np.arange(0, len(samples) - frame_length, hop_length)
+
+            start = time.perf_counter()
+            compute_window_features(samples, frame_rate, frame_length, frame_starts, profile['whistle_method'])
+            feature_seconds = time.perf_counter() - start
+
+            extractor = HighlightExtractor("synthetic", num_highlights=args.num_highlights,
+                                           output_dir=os.path.join(temp_dir, name), audio_profile=name)
+            extractor.audio_path = audio_path
+            extractor.analyze_audio()
+            extractor.cleanup()
+
+            results[name] = {
+                'wav_mb': os.path.getsize(audio_path) / 1e6,
+                'feature_seconds': feature_seconds,
+                'times': np.asarray(extractor.highlight_timestamps['time']),
+            }
+
+        reference = results['full']['times']
+        print(f"\nSynthetic game: {args.duration} s, top {args.num_highlights} highlights")
+        print(f"{'profile':<8} {'rate':>6} {'WAV MB':>8} {'features s':>11} {'speedup':>8} {'top-N overlap':>14}")
+        for name, result in results.items():
+            # Hop lengths differ slightly between sample rates, so match peaks within half a second
+            matched = sum(np.any(np.abs(reference - t) <= 0.5) for t in result['times'])
+            overlap = matched / max(1, len(reference))
+            speedup = results['full']['feature_seconds'] / result['feature_seconds']
+            print(f"{name:<8} {AUDIO_PROFILES[name]['sample_rate']:>6} {result['wav_mb']:>8.1f} "
+                  f"{result['feature_seconds']:>11.2f} {speedup:>7.1f}x {overlap:>13.0%}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the clip encode profiles and the transcoding ladder.
+
+Generates a synthetic 1080p test video with ffmpeg, then times a 10 second
+highlight clip for every encode profile: a single 1080p output, the ladder
+(1080p/720p/480p from one decode) and the same three renditions encoded in
+separate ffmpeg runs.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "audio_highlights"))
+
+from highlight_extractor import ENCODE_PROFILES, LADDER_HEIGHTS, HighlightExtractor  # noqa: E402
+
+
+def make_test_video(path, duration):
+    """Write a 1080p synthetic video (moving test pattern, tone audio)."""
+    subprocess.run([
+        "ffmpeg", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size=1920x1080:rate=30:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "18", "-c:a", "aac", "-shortest",
+        path
+    ], check=True)
+
+
+def timed_run(cmds):
+    """Run the commands one after another and return the elapsed seconds."""
+    start = time.perf_counter()
+    for cmd in cmds:
+        subprocess.run(cmd, check=True)
+    return time.perf_counter() - start
+
+
+def megabytes(paths):
+    return sum(os.path.getsize(path) for path in paths) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clip encode profiles and the transcoding ladder.")
+    parser.add_argument("--duration", type=int, default=30, help="Length of the synthetic video in seconds")
+    parser.add_argument("--clip_start", type=float, default=10.0, help="Start of the benchmarked clip")
+    parser.add_argument("--clip_length", type=float, default=10.0, help="Length of the benchmarked clip")
+    parser.add_argument("--profiles", nargs="+", choices=list(ENCODE_PROFILES), default=list(ENCODE_PROFILES),
+                        help="Encode profiles to benchmark")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(temp_dir, "source.mp4")
+        make_test_video(source, args.duration)
+
+        print(f"\n1080p synthetic video, {args.clip_length:.0f} s clip")
+        print(f"{'profile':<9} {'single s':>9} {'single MB':>10} {'ladder s':>9} {'ladder MB':>10} {'3 runs s':>9}")
+
+        for name in args.profiles:
+            single = HighlightExtractor(source, output_dir=temp_dir, encode_profile=name)
+            ladder = HighlightExtractor(source, output_dir=temp_dir, encode_profile=name, ladder=True)
+            clip = os.path.join(temp_dir, f"{name}.mp4")
+            ladder_clip = os.path.join(temp_dir, f"{name}_ladder.mp4")
+            ladder_paths = [ladder_clip] + [ladder._rendition_path(ladder_clip, h) for h in LADDER_HEIGHTS[1:]]
+
+            single_seconds = timed_run([single._encode_cmd(source, clip, args.clip_start, args.clip_length)])
+            ladder_seconds = timed_run([ladder._encode_cmd(source, ladder_clip, args.clip_start, args.clip_length)])
+
+            # The same renditions as separate encodes, each decoding the source again
+            separate_cmds = []
+            for height in LADDER_HEIGHTS:
+                single.ladder_heights = (height,)
+                separate_cmds.append(single._encode_cmd(
+                    source, os.path.join(temp_dir, f"{name}_{height}.mp4"), args.clip_start, args.clip_length
+                ))
+            separate_seconds = timed_run(separate_cmds)
+
+            print(f"{name:<9} {single_seconds:>9.2f} {megabytes([clip]):>10.2f} "
+                  f"{ladder_seconds:>9.2f} {megabytes(ladder_paths):>10.2f} {separate_seconds:>9.2f}")
+
+            for extractor in (single, ladder):
+                extractor.cleanup()
+    finally:
+        shutil.rmtree(temp_dir)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
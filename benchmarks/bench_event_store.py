@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the compact play-by-play event store.
+
+Loads a scraped game (pbp_<game_id>.json) as a whole season of copies, as the
+list of dicts PlayByPlayScraper produces and as an EventStore, and compares
+bytes per event and filter times.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+SCRAPER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "scraper")
+sys.path.insert(0, SCRAPER_DIR)
+
+from event_store import EventStore, dict_events_nbytes  # noqa: E402
+
+
+def load_season(path, n_games):
+    """Load the game n_games times; every copy gets its own string objects, like separate scrapes."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return {f"game_{i}": json.loads(text) for i in range(n_games)}
+
+
+def time_call(func, repeat=5):
+    """Best wall time of func() over repeat runs, and its result."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact play-by-play event store.")
+    parser.add_argument("--input", default=os.path.join(SCRAPER_DIR, "pbp_374043.json"),
+                        help="Scraped play-by-play JSON file used as the template game")
+    parser.add_argument("--games", type=int, default=240, help="Number of games in the synthetic season")
+    args = parser.parse_args()
+
+    season = load_season(args.input, args.games)
+    all_events = [event for events in season.values() for event in events]
+    n_events = len(all_events)
+
+    start = time.perf_counter()
+    store = EventStore()
+    for game_id, events in season.items():
+        store.add_game(game_id, events)
+    build_time = time.perf_counter() - start
+
+    dict_bytes = dict_events_nbytes(all_events)
+    store_bytes = store.nbytes()
+
+    print(f"Season: {args.games} games, {n_events} events")
+    print(f"Vocabularies: {len(store.players)} players, {len(store.actions)} actions, {len(store.periods)} periods")
+    print(f"Store build time: {build_time:.2f} s")
+    print()
+    print(f"{'representation':<16}{'total MB':>10}{'bytes/event':>14}")
+    print(f"{'list of dicts':<16}{dict_bytes / 1e6:>10.1f}{dict_bytes / n_events:>14.0f}")
+    print(f"{'EventStore':<16}{store_bytes / 1e6:>10.1f}{store_bytes / n_events:>14.0f}")
+    print(f"Reduction: {dict_bytes / store_bytes:.0f}x")
+    print()
+
+    player = all_events[0]["player_name"]
+    last_game = f"game_{args.games - 1}"
+    filters = {
+        "player": (
+            {"player": player},
+            lambda: [e for e in all_events if e["player_name"] == player],
+        ),
+        "game + period": (
+            {"game": last_game, "period": "Q4"},
+            lambda: [e for e in season[last_game] if e["quarter"] == "Q4"],
+        ),
+        "player + period": (
+            {"player": player, "period": "Q4"},
+            lambda: [e for e in all_events if e["player_name"] == player and e["quarter"] == "Q4"],
+        ),
+    }
+
+    print(f"{'filter':<18}{'dicts ms':>10}{'store ms':>10}{'matches':>9}")
+    for name, (kwargs, dict_filter) in filters.items():
+        dict_time, dict_matches = time_call(dict_filter)
+        store_time, store_matches = time_call(lambda: store.filter(**kwargs))
+        assert len(dict_matches) == len(store_matches)
+        print(f"{name:<18}{dict_time * 1e3:>10.2f}{store_time * 1e3:>10.2f}{len(store_matches):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Asyncio API for the Basketball Highlights Extractor.
+
+AsyncHighlightExtractor runs the same pipeline as HighlightExtractor without
+blocking the event loop, so one process can drive many games concurrently:
+
+    extractor = AsyncHighlightExtractor(url, output_dir="highlights/game_1")
+    task = asyncio.create_task(extractor.run())
+    async for event in extractor.events():
+        print(event["stage"], event["status"], event["message"])
+    success = await task
+
+Child processes (yt-dlp, ffmpeg) are started with asyncio.create_subprocess_exec
+and killed, together with any processes they spawned, when the task is cancelled.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+
+import ffmpeg
+
+from highlight_extractor import FORMAT_UNAVAILABLE, HighlightExtractor
+
+
+class AsyncHighlightExtractor(HighlightExtractor):
+    """Non-blocking highlight extractor reporting progress through an async iterator."""
+
+    def __init__(self, *args, **kwargs):
+        """Accepts the same arguments as HighlightExtractor."""
+        # Set before the base initializer, which may already log (e.g. while loading checkpoints)
+        self._queue = None
+        self._loop = None
+        self._stage = "init"
+        super().__init__(*args, **kwargs)
+
+    def _ensure_event_queue(self):
+        """Create the event queue on first use, bound to the loop running the pipeline."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._loop = asyncio.get_running_loop()
+        return self._queue
+
+    def _emit(self, status, message=None, **details):
+        """Queue a progress event; safe to call from executor threads."""
+        if self._queue is None:
+            # A stage awaited on its own, outside run() and events(): nobody listens for events
+            if message:
+                super()._log(message)
+            return
+
+        event = {"stage": self._stage, "status": status, "message": message, **details}
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+
+        if on_loop:
+            self._queue.put_nowait(event)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    def _log(self, message):
+        """Progress messages become "log" events instead of stdout output."""
+        if self._queue is None:
+            # Not running a pipeline (e.g. a single method called directly); nobody listens
+            super()._log(message)
+        else:
+            self._emit("log", message)
+
+    async def events(self):
+        """
+        Iterate over progress events until the pipeline finishes.
+
+        Each event is a dict with "stage", "status" ("started", "completed", "failed",
+        "skipped", "log", "cancelled" or "finished") and "message" keys, plus stage-specific details.
+        """
+        queue = self._ensure_event_queue()
+        while True:
+            event = await queue.get()
+            if event is None:
+                return
+            yield event
+
+    async def _run_command(self, cmd):
+        """
+        Run a command without blocking the event loop.
+
+        Returns:
+            str: The command's stderr output
+
+        Raises:
+            subprocess.CalledProcessError: If the command exits with a non-zero status
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            # Own process group, so yt-dlp's ffmpeg children can be killed with it
+            start_new_session=(os.name == "posix")
+        )
+
+        try:
+            _, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            self._kill(process)
+            await process.wait()
+            raise
+
+        stderr = stderr.decode(errors="replace")
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr)
+        return stderr
+
+    @staticmethod
+    def _kill(process):
+        """Kill a child process and everything it spawned."""
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+
+    async def _run_stage(self, stage, cmd, message):
+        """Run one command as a pipeline stage, emitting started/completed/failed events."""
+        self._stage = stage
+        self._emit("started", message)
+        try:
+            stderr = await self._run_command(cmd)
+        except subprocess.CalledProcessError as e:
+            # Keep only the tail of the output; ffmpeg logs can be long
+            self._emit("failed", f"{message} failed with exit code {e.returncode}", stderr=e.stderr[-2000:])
+            return None
+        self._emit("completed")
+        return stderr
+
+    async def download_video(self):
+        """Download the video (or only the analysis audio in sections mode)."""
+        if self.download_mode == "sections" and not self.sections_fallback:
+            message = f"Downloading audio for analysis from {self.url}"
+            self._stage = "download"
+            self._emit("started", message)
+            try:
+                await self._run_command(self._analysis_media_cmd())
+                self._emit("completed")
+                return True
+            except subprocess.CalledProcessError as e:
+                if FORMAT_UNAVAILABLE not in e.stderr:
+                    self._emit("failed", f"{message} failed with exit code {e.returncode}", stderr=e.stderr[-2000:])
+                    return False
+                # No audio-only rendition: download the full video once and cut the clips from it
+                self._use_full_video()
+
+        return await self._run_stage("download", self._download_cmd(), f"Downloading video from {self.url}") is not None
+
+    async def extract_audio(self):
+        """Decode the analysis audio to WAV."""
+        cmd = ffmpeg.compile(self._extract_audio_stream(), overwrite_output=True)
+        return await self._run_stage("extract_audio", cmd, "Extracting audio") is not None
+
+    async def detect_dead_segments(self):
+        """Run the coarse dead-time pre-scan."""
+        stderr = await self._run_stage("dead_time", self._dead_time_scan_cmd(), "Scanning for dead time")
+        if stderr is None:
+            self.dead_segments = []
+            return False
+        self._store_dead_segments(stderr)
+        return True
+
+    async def analyze_audio(self):
+        """Run the CPU-bound audio analysis in a worker thread."""
+        self._stage = "analyze"
+        self._emit("started", "Analyzing audio for peak moments")
+        loop = asyncio.get_running_loop()
+
+        # The thread cannot be interrupted; on cancellation it finishes in the background
+        if not await loop.run_in_executor(None, super().analyze_audio):
+            self._emit("failed", "Audio analysis failed")
+            return False
+
+        self._emit("completed", highlights=len(self.highlight_timestamps))
+        return True
+
+    async def extract_highlights(self):
+        """Cut (or download) the highlight clips, one child process at a time."""
+        loop = asyncio.get_running_loop()
+        video_duration = await loop.run_in_executor(None, self._media_duration)
+        self._open_store()
+        plan = self._clip_plan(video_duration)
+
+        clip_paths = []
+        self.failed_clips = []
+        for clip_number, start_time, end_time, output_path in plan:
+            clip_paths.append(output_path)
+
+            if self._clip_done(clip_number, output_path):
+                self._record_highlight(clip_number, start_time, end_time, output_path)
+                self._mark_clip_done(clip_number, plan)
+                self._stage = "extract_highlights"
+                self._emit("skipped", f"Highlight {clip_number}/{len(plan)} already extracted", path=output_path)
+                continue
+
+            for cmd in self._clip_cmds(start_time, end_time, output_path):
+                stderr = await self._run_stage(
+                    "extract_highlights", cmd, f"Extracting highlight {clip_number}/{len(plan)}"
+                )
+                if stderr is None:
+                    self.failed_clips.append(clip_number)
+                    break
+            else:
+                self._record_highlight(clip_number, start_time, end_time, output_path)
+                self._mark_clip_done(clip_number, plan)
+
+        return clip_paths
+
+    async def compile_highlights(self, clip_paths):
+        """Concatenate the clips into a single video."""
+        concat_file = self._write_concat_list(clip_paths)
+        output_path = self._compilation_path()
+
+        cmd = self._compile_cmd(concat_file, output_path)
+        if await self._run_stage("compile", cmd, "Compiling highlights") is None:
+            return None
+        return output_path
+
+    async def _run_resumable(self, stage, step):
+        """Run a pipeline step unless its checkpoint shows it already completed."""
+        if self._resume_stage(stage):
+            self._stage = stage
+            self._emit("skipped", f"{stage} already completed")
+            return True
+        if not await step():
+            return False
+        self._mark_stage_done(stage, **self._checkpoint_data(stage))
+        return True
+
+    async def run(self, compile_clips=True):
+        """
+        Run the entire highlight extraction pipeline; cancelling the task kills child processes.
+
+        With a work_dir, completed stages are checkpointed and the work directory is
+        kept unless the run completes, so a cancelled or failed run can be resumed.
+        """
+        success = False
+        complete = False
+        self._ensure_event_queue()
+
+        try:
+            if not await self._run_resumable("download", self.download_video):
+                return False
+
+            if not await self._run_resumable("audio", self.extract_audio):
+                return False
+
+            # Dead-time scan failures are not fatal; the full audio is analyzed instead
+            if self.skip_dead_time:
+                await self._run_resumable("dead_time", self.detect_dead_segments)
+
+            if not await self._run_resumable("analysis", self.analyze_audio):
+                return False
+
+            clip_paths = await self.extract_highlights()
+            complete = not self.failed_clips
+
+            if compile_clips and clip_paths:
+                complete = await self.compile_highlights(clip_paths) is not None and complete
+
+            success = True
+
+        except asyncio.CancelledError:
+            self._emit("cancelled", "Highlight extraction cancelled")
+            raise
+
+        except Exception as e:
+            self._emit("failed", f"Error during highlight extraction: {e}")
+
+        finally:
+            self._stage = "cleanup"
+            self.cleanup(keep_work_dir=bool(self.work_dir) and not complete)
+            self._stage = "run"
+            self._emit("finished", success=success)
+            self._queue.put_nowait(None)
+
+        return success
@@ -0,0 +1,576 @@
+"""
+Audio processing utilities for the Basketball Highlights Extractor.
+
+Helpers shared by the highlight extractor for reading WAV audio, computing
+per-window features, nominating candidate regions from a coarse loudness
+envelope, locating dead time (ad breaks, halftime, pre-game) in a broadcast
+and deriving adaptive thresholds from streaming quantile sketches.
+"""
+
+import re
+import wave
+
+import numpy as np
+from scipy.signal import butter, sosfilt
+
+
+# Referee whistles typically have strong components between 2000-4000 Hz
+WHISTLE_BAND = (2000, 4000)
+
+# Decoding/feature profiles. "full" decodes at 22050 Hz and measures the whistle
+# band with an FFT per window (magnitude ratio). "fast" decodes at 11025 Hz, the
+# lowest standard rate whose Nyquist frequency (5512 Hz) clears the whistle band
+# with room for the resampler roll-off, and measures the band with one IIR
+# band-pass over the whole track (power ratio). The two ratios are on different
+# scales, so each profile carries its own whistle threshold. In adaptive mode the
+# threshold is median + whistle_headroom * (1 - median) of the game's ratios; the
+# headroom reproduces the fixed threshold at the crowd level it was tuned on.
+AUDIO_PROFILES = {
+    "full": {"sample_rate": 22050, "whistle_method": "fft", "whistle_threshold": 0.4, "whistle_headroom": 0.2},
+    "fast": {"sample_rate": 11025, "whistle_method": "iir", "whistle_threshold": 0.6, "whistle_headroom": 0.55},
+}
+WHISTLE_FILTER_ORDER = 4  # Butterworth order of the band-pass used by the "iir" method
+WHISTLE_FILTER_WARMUP = 0.05     # Seconds filtered ahead of each analyzed span so the band-pass settles
+FEATURE_CHUNK_SAMPLES = 1 << 20  # Samples the "iir" method filters at a time
+
+# ffmpeg filter settings used by the coarse dead-time pre-scan
+SILENCE_NOISE_DB = -40      # Anything quieter than this counts as silence
+SILENCE_MIN_DURATION = 20   # Seconds of silence before a segment is marked dead
+BLACK_MIN_DURATION = 10     # Seconds of black frames before a segment is marked dead
+BLACK_PICTURE_THRESHOLD = 0.98  # Ratio of black pixels for a frame to count as black
+DEAD_SEGMENT_MERGE_GAP = 30     # Dead segments closer than this are merged into one
+
+# Ads and halftime shows are mixed to a compressed, nearly constant loudness, while
+# live game audio swings with the crowd, the commentary and the whistles
+LOUDNESS_FLAT_MIN_DURATION = 30  # Seconds of flat loudness before a segment is marked dead
+LOUDNESS_FLAT_RANGE_LU = 2.0     # Largest 10th-90th percentile spread of short-term loudness that counts as flat
+LOUDNESS_FLAT_FLOOR_LUFS = -50   # Quieter stretches are left to silencedetect
+LOUDNESS_STEP_SECONDS = 1.0      # Resolution the ebur128 readings are reduced to
+
+# Coarse-to-fine peak search settings
+COARSE_BLOCK_SECONDS = 1.0  # Length of a loudness envelope block
+COARSE_DECIMATION = 8       # Keep every Nth sample for the envelope
+COARSE_PERCENTILE = 90      # Blocks at or above this percentile become candidates
+COARSE_MARGIN_SECONDS = 2.0 # Context analyzed on each side of a candidate block
+
+# Adaptive threshold settings
+ADAPTIVE_BASELINE_SECONDS = 30.0  # Time constant of the rolling crowd-level baseline
+ADAPTIVE_ENERGY_QUANTILE = 0.95   # Peaks must rise above this quantile of energy over the baseline
+
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+_BLACK_RE = re.compile(r"black_start:\s*(-?[\d.]+)\s+black_end:\s*(-?[\d.]+)")
+_EBUR128_RE = re.compile(r"\bt:\s*([\d.]+)\s+TARGET:.*?\bS:\s*(-?[\d.]+|-?inf)")
+
+
+def load_wav_samples(audio_path):
+    """
+    Read a PCM WAV file into a mono float array normalized to -1.0..1.0.
+
+    Returns:
+        tuple: (samples, frame_rate)
+    """
+    with wave.open(audio_path, 'rb') as wav_file:
+        n_channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        frame_rate = wav_file.getframerate()
+        n_frames = wav_file.getnframes()
+
+        # Read all frames at once
+        binary_data = wav_file.readframes(n_frames)
+
+    # Convert binary data to numpy array (assuming 16-bit PCM, which is common)
+    if sample_width == 2:  # 16-bit audio
+        dtype = np.int16
+    elif sample_width == 4:  # 32-bit audio
+        dtype = np.int32
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+
+    samples = np.frombuffer(binary_data, dtype=dtype)
+
+    # If stereo, convert to mono by averaging channels
+    if n_channels == 2:
+        samples = samples.reshape(-1, 2).mean(axis=1)
+
+    # Normalize to -1.0 to 1.0
+    return samples / np.iinfo(dtype).max, frame_rate
+
+
+def compute_window_features(samples, frame_rate, frame_length, frame_starts, whistle_method="fft"):
+    """
+    Compute RMS energy and whistle energy ratio for the given windows.
+
+    Args:
+        samples (np.ndarray): Mono audio samples
+        frame_rate (int): Sample rate of the audio
+        frame_length (int): Window length in samples
+        frame_starts (iterable): Sample offsets of the windows to analyze
+        whistle_method (str): "fft" for a full-spectrum FFT per window, "iir" for a
+            single band-pass filter over the whole signal
+
+    Returns:
+        tuple: (energy, whistle_feature) arrays, one value per window
+    """
+    if whistle_method == "iir":
+        return _compute_window_features_iir(samples, frame_rate, frame_length, frame_starts)
+    if whistle_method != "fft":
+        raise ValueError(f"Unknown whistle method: {whistle_method}")
+
+    window = np.hamming(frame_length)
+    freq_bins = np.fft.rfftfreq(frame_length, 1/frame_rate)
+    whistle_range_mask = (freq_bins >= WHISTLE_BAND[0]) & (freq_bins <= WHISTLE_BAND[1])
+
+    energy = []
+    whistle_feature = []
+
+    for i in frame_starts:
+        chunk = samples[i:i + frame_length]
+
+        # Calculate RMS energy
+        energy.append(np.sqrt(np.mean(chunk**2)))
+
+        # Whistle feature - energy ratio in the whistle frequency range
+        fft_magnitude = np.abs(np.fft.rfft(chunk * window))
+        total_energy = np.sum(fft_magnitude)
+
+        if total_energy > 0:
+            whistle_feature.append(np.sum(fft_magnitude[whistle_range_mask]) / total_energy)
+        else:
+            whistle_feature.append(0)
+
+    return np.array(energy), np.array(whistle_feature)
+
+
+def _analyzed_spans(frame_starts, frame_length, warmup):
+    """
+    Group sorted window starts into contiguous sample spans.
+
+    Windows whose warm-up reaches back into the previous window share its span,
+    so an exhaustive pass is one span and a coarse pass one span per candidate region.
+
+    Returns:
+        list: (first window index, last window index + 1) tuples
+    """
+    breaks = np.flatnonzero(frame_starts[1:] - warmup > frame_starts[:-1] + frame_length) + 1
+    return list(zip(np.r_[0, breaks], np.r_[breaks, len(frame_starts)]))
+
+
+def _span_cumulative_power(samples, sos, start, end, positions):
+    """
+    Running sums of squares of the samples and of their band-passed version over a span.
+
+    The span is filtered in chunks of FEATURE_CHUNK_SAMPLES with the filter state
+    carried across chunks, so no full-length copy of the track is made.
+
+    Args:
+        positions (np.ndarray): Sorted sample positions in [start, end]; the sums
+            cover the samples from start up to (not including) each position
+
+    Returns:
+        tuple: (total, band) arrays, one sum per position
+    """
+    total = np.empty(len(positions))
+    band = np.empty(len(positions))
+    zi = np.zeros((sos.shape[0], 2))
+    total_sum = band_sum = 0.0
+    done = 0
+
+    for chunk_start in range(start, end, FEATURE_CHUNK_SAMPLES):
+        chunk = samples[chunk_start:min(end, chunk_start + FEATURE_CHUNK_SAMPLES)]
+        filtered, zi = sosfilt(sos, chunk, zi=zi)
+
+        total_cumsum = np.cumsum(np.square(chunk)) + total_sum
+        band_cumsum = np.cumsum(np.square(filtered)) + band_sum
+
+        # Positions inside this chunk read the running sums up to the sample before them
+        until = np.searchsorted(positions, chunk_start + len(chunk), side='right')
+        offsets = positions[done:until] - chunk_start
+        total[done:until] = np.where(offsets > 0, total_cumsum[np.maximum(offsets - 1, 0)], total_sum)
+        band[done:until] = np.where(offsets > 0, band_cumsum[np.maximum(offsets - 1, 0)], band_sum)
+        done = until
+
+        total_sum, band_sum = total_cumsum[-1], band_cumsum[-1]
+
+    return total, band
+
+
+def _compute_window_features_iir(samples, frame_rate, frame_length, frame_starts):
+    """
+    Vectorized window features: RMS energy and the whistle band power ratio.
+
+    The whistle band is isolated with one Butterworth band-pass run over the
+    analyzed spans only (the whole track in an exhaustive pass), so the cost is
+    linear in the number of analyzed samples instead of an FFT per window.
+    Window powers come from running sums of squares kept chunk by chunk, so
+    memory stays at a few chunks on top of the samples themselves.
+    """
+    frame_starts = np.asarray(frame_starts, dtype=int)
+    if len(frame_starts) == 0:
+        return np.array([]), np.array([])
+
+    sos = butter(WHISTLE_FILTER_ORDER, WHISTLE_BAND, btype='bandpass', fs=frame_rate, output='sos')
+    warmup = int(frame_rate * WHISTLE_FILTER_WARMUP)
+
+    # Spans are found on sorted starts; results are written back in the order given
+    order = np.argsort(frame_starts, kind='stable')
+    starts = frame_starts[order]
+    total_power = np.empty(len(starts))
+    band_power = np.empty(len(starts))
+
+    for first, last in _analyzed_spans(starts, frame_length, warmup):
+        span_starts = starts[first:last]
+        span_start = max(0, span_starts[0] - warmup)
+
+        # Running sums at every window edge; the window power is the difference across it
+        positions = np.unique(np.r_[span_starts, span_starts + frame_length])
+        total, band = _span_cumulative_power(samples, sos, span_start, positions[-1], positions)
+        left = np.searchsorted(positions, span_starts)
+        right = np.searchsorted(positions, span_starts + frame_length)
+        total_power[order[first:last]] = (total[right] - total[left]) / frame_length
+        band_power[order[first:last]] = (band[right] - band[left]) / frame_length
+
+    whistle_feature = np.divide(band_power, total_power, out=np.zeros_like(total_power),
+                                where=total_power > 0)
+
+    return np.sqrt(total_power), np.clip(whistle_feature, 0.0, 1.0)
+
+
+def coarse_envelope(samples, frame_rate, block_seconds=COARSE_BLOCK_SECONDS,
+                    decimation=COARSE_DECIMATION):
+    """
+    Compute a cheap loudness envelope: RMS in dB over fixed blocks of decimated audio.
+
+    Decimating without a low-pass filter folds high frequencies down instead of
+    removing them, so the block RMS stays a good estimate of the full-band level.
+
+    Returns:
+        tuple: (block_times, envelope_db) arrays, one value per block
+    """
+    decimated = samples[::decimation]
+    block_length = max(1, int(frame_rate * block_seconds / decimation))
+    n_blocks = len(decimated) // block_length
+
+    blocks = decimated[:n_blocks * block_length].reshape(n_blocks, block_length)
+    rms = np.sqrt(np.mean(blocks**2, axis=1))
+
+    eps = 1e-10  # to avoid log(0)
+    return np.arange(n_blocks) * block_seconds, 20.0 * np.log10(rms + eps)
+
+
+def nominate_candidate_regions(block_times, envelope_db, block_seconds=COARSE_BLOCK_SECONDS,
+                               percentile=COARSE_PERCENTILE, margin=COARSE_MARGIN_SECONDS):
+    """
+    Nominate regions worth a full-resolution analysis from a coarse envelope.
+
+    Every block at or above the given percentile becomes a candidate, widened by
+    margin seconds on both sides so peaks near a block edge keep their context.
+
+    Returns:
+        list: Sorted, non-overlapping (start, end) tuples in seconds
+    """
+    if len(envelope_db) == 0:
+        return []
+
+    threshold = np.percentile(envelope_db, percentile)
+    hot_times = block_times[envelope_db >= threshold]
+
+    return merge_segments([
+        (max(0.0, t - margin), t + block_seconds + margin) for t in hot_times
+    ])
+
+
+def parse_silencedetect(ffmpeg_output, total_duration=None):
+    """
+    Parse silence segments from the stderr of an ffmpeg silencedetect run.
+
+    A silence that is still open when the stream ends is closed at
+    total_duration (or dropped if the duration is unknown).
+
+    Returns:
+        list: (start, end) tuples in seconds
+    """
+    segments = []
+    start = None
+
+    for line in ffmpeg_output.splitlines():
+        start_match = _SILENCE_START_RE.search(line)
+        if start_match:
+            start = max(0.0, float(start_match.group(1)))
+            continue
+
+        end_match = _SILENCE_END_RE.search(line)
+        if end_match and start is not None:
+            segments.append((start, float(end_match.group(1))))
+            start = None
+
+    if start is not None and total_duration is not None:
+        segments.append((start, float(total_duration)))
+
+    return segments
+
+
+def parse_blackdetect(ffmpeg_output):
+    """
+    Parse black-frame segments from the stderr of an ffmpeg blackdetect run.
+
+    Returns:
+        list: (start, end) tuples in seconds
+    """
+    return [
+        (max(0.0, float(match.group(1))), float(match.group(2)))
+        for match in _BLACK_RE.finditer(ffmpeg_output)
+    ]
+
+
+def parse_ebur128(ffmpeg_output):
+    """
+    Parse the short-term loudness readings (3 s window, every 0.1 s) of an ffmpeg ebur128 run.
+
+    Returns:
+        tuple: (times, loudness) arrays, in seconds and LUFS
+    """
+    readings = [(float(match.group(1)), float(match.group(2))) for match in _EBUR128_RE.finditer(ffmpeg_output)]
+    if not readings:
+        return np.zeros(0), np.zeros(0)
+
+    times, loudness = np.array(readings).T
+    return times, loudness
+
+
+def flat_loudness_segments(times, loudness, min_duration=LOUDNESS_FLAT_MIN_DURATION,
+                           max_range=LOUDNESS_FLAT_RANGE_LU, floor=LOUDNESS_FLAT_FLOOR_LUFS,
+                           step=LOUDNESS_STEP_SECONDS):
+    """
+    Find compressed, constant-loudness stretches (ads, halftime shows) in a loudness profile.
+
+    The readings are reduced to one per step seconds, and every min_duration stretch
+    whose 10th-90th percentile spread stays within max_range LU, above the floor,
+    is marked. The spread ignores single spikes and dips, which a broadcast mix
+    still has, but not the swings of live crowd noise and commentary.
+
+    Returns:
+        list: Sorted, non-overlapping (start, end) tuples in seconds
+    """
+    times = np.asarray(times, dtype=float)
+    loudness = np.asarray(loudness, dtype=float)
+
+    # Short-term loudness already averages 3 seconds, so one reading per step loses little
+    _, first = np.unique((times // step).astype(int), return_index=True)
+    times, loudness = times[first], loudness[first]
+
+    window = int(round(min_duration / step))
+    if len(loudness) < window:
+        return []
+
+    stretches = np.lib.stride_tricks.sliding_window_view(loudness, window)
+    low, high = np.percentile(stretches, [10, 90], axis=1)
+    flat = (high - low <= max_range) & (low > floor)
+
+    return merge_segments([(times[i], times[i + window - 1]) for i in np.flatnonzero(flat)])
+
+
+def merge_segments(segments, max_gap=0.0):
+    """
+    Merge overlapping segments, and segments separated by at most max_gap seconds.
+
+    Returns:
+        list: Sorted, non-overlapping (start, end) tuples
+    """
+    merged = []
+
+    for start, end in sorted(segments):
+        if end <= start:
+            continue
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def segments_mask(times, segments, window_duration=0.0):
+    """
+    Build a boolean mask marking the windows that overlap any of the segments.
+
+    Args:
+        times (np.ndarray): Window start times in seconds
+        segments (list): (start, end) tuples in seconds
+        window_duration (float): Length of each window in seconds
+
+    Returns:
+        np.ndarray: True where the window [t, t + window_duration] overlaps a segment
+    """
+    times = np.asarray(times, dtype=float)
+    mask = np.zeros(len(times), dtype=bool)
+
+    for start, end in segments:
+        mask |= (times + window_duration > start) & (times < end)
+
+    return mask
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate in O(1) memory (the P-squared algorithm of Jain and Chlamtac).
+
+    Keeps five markers (minimum, p/2, p, (1+p)/2 and maximum quantiles) whose heights
+    are adjusted with a piecewise-parabolic fit as observations arrive, so no
+    observation is stored after the first five.
+    """
+
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError(f"Quantile must be between 0 and 1, got {p}")
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x):
+        """Add one observation."""
+        x = float(x)
+        self.count += 1
+
+        if self.count <= 5:
+            self.heights.append(x)
+            self.heights.sort()
+            return
+
+        q, n = self.heights, self.positions
+
+        # Find the cell the observation falls into, extending the extremes if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers toward their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        """Current estimate of the quantile (exact while there are five observations or fewer)."""
+        if self.count == 0:
+            raise ValueError("No observations")
+        if self.count <= 5:
+            return float(np.percentile(self.heights, self.p * 100))
+        return self.heights[2]
+
+
+class RollingBaseline:
+    """
+    Local baseline of a feature: an exponential moving average in O(1) memory.
+
+    With a time constant much longer than a highlight (e.g. half a minute against a few
+    seconds of crowd roar), the baseline follows the venue and game-phase level but
+    not individual peaks.
+    """
+
+    def __init__(self, time_constant, step):
+        """
+        Args:
+            time_constant (float): Seconds for the baseline to cover ~63% of a level change
+            step (float): Seconds between consecutive observations
+        """
+        self.alpha = 1.0 - np.exp(-step / time_constant)
+        self.value = None
+
+    def update(self, x):
+        """
+        Add one observation.
+
+        Returns:
+            float: The observation relative to the baseline before it (x - baseline)
+        """
+        if self.value is None:
+            self.value = float(x)
+        relative = x - self.value
+        self.value += self.alpha * relative
+        return relative
+
+
+class AdaptiveThresholds:
+    """
+    Per-game energy and whistle thresholds from streaming statistics, in O(1) memory.
+
+    Energy is measured relative to a rolling baseline, so a segment only counts as
+    loud against the crowd level around it; the energy threshold is a streaming
+    quantile of that relative energy. The whistle threshold sits a fixed share of
+    the remaining headroom above the game's median whistle ratio.
+
+    Feed one observation at a time, from a file or a live stream:
+
+        thresholds = AdaptiveThresholds(step=0.1, whistle_headroom=0.2)
+        for energy_db, whistle in features:
+            relative_db = thresholds.update(energy_db, whistle)
+            if relative_db > thresholds.energy_threshold() and whistle <= thresholds.whistle_threshold():
+                ...
+    """
+
+    def __init__(self, step, whistle_headroom, energy_quantile=ADAPTIVE_ENERGY_QUANTILE,
+                 baseline_seconds=ADAPTIVE_BASELINE_SECONDS):
+        """
+        Args:
+            step (float): Seconds between consecutive energy observations
+            whistle_headroom (float): Share of the headroom above the median whistle ratio
+                at which the whistle threshold sits (see AUDIO_PROFILES)
+            energy_quantile (float): Quantile of the relative energy used as peak threshold
+            baseline_seconds (float): Time constant of the rolling baseline
+        """
+        self.baseline = RollingBaseline(baseline_seconds, step)
+        self.energy_sketch = P2Quantile(energy_quantile)
+        self.whistle_sketch = P2Quantile(0.5)
+        self.whistle_headroom = whistle_headroom
+
+    def update_energy(self, energy_db):
+        """Add an energy observation; returns it relative to the baseline in dB."""
+        relative = self.baseline.update(energy_db)
+        self.energy_sketch.update(relative)
+        return relative
+
+    def update_whistle(self, whistle):
+        """Add a whistle ratio observation."""
+        self.whistle_sketch.update(whistle)
+
+    def update(self, energy_db, whistle):
+        """Add the features of one window; returns its energy relative to the baseline in dB."""
+        self.update_whistle(whistle)
+        return self.update_energy(energy_db)
+
+    def energy_threshold(self):
+        """Current peak threshold for the relative energy in dB."""
+        return self.energy_sketch.value()
+
+    def whistle_threshold(self):
+        """Current whistle ratio threshold."""
+        median = self.whistle_sketch.value()
+        return median + self.whistle_headroom * (1.0 - median)
@@ -7,22 +7,83 @@ This script extracts highlight moments from basketball games based on audio peak
 
 import os
 import argparse
+import json
+import re
 import subprocess
 import tempfile
 import shutil
 from datetime import datetime
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from scipy.signal import find_peaks
 import ffmpeg
 import wave  # Standard library module for reading WAV files
 
+from audio_processing import (
+    AUDIO_PROFILES,
+    AdaptiveThresholds,
+    BLACK_MIN_DURATION,
+    BLACK_PICTURE_THRESHOLD,
+    COARSE_BLOCK_SECONDS,
+    DEAD_SEGMENT_MERGE_GAP,
+    SILENCE_MIN_DURATION,
+    SILENCE_NOISE_DB,
+    coarse_envelope,
+    compute_window_features,
+    flat_loudness_segments,
+    load_wav_samples,
+    merge_segments,
+    nominate_candidate_regions,
+    parse_blackdetect,
+    parse_ebur128,
+    parse_silencedetect,
+    segments_mask,
+)
+from highlight_store import HighlightStore
+
+
+# yt-dlp format selections
+VIDEO_FORMAT = "bestvideo[height<=1080]+bestaudio/best[ext=mp4]/best"  # Highest quality up to 1080p
+ANALYSIS_FORMAT = "bestaudio"  # Audio-only rendition for analysis
+# yt-dlp's error when a source has no rendition matching the format selection
+FORMAT_UNAVAILABLE = "Requested format is not available"
+
+# libx264 encode profiles for highlight clips. "default" matches ffmpeg's own defaults.
+ENCODE_PROFILES = {
+    "preview": {"preset": "ultrafast", "crf": 28},
+    "default": {"preset": "medium", "crf": 23},
+    "archival": {"preset": "slow", "crf": 18},
+}
+
+# Rendition heights produced by the transcoding ladder, highest first
+LADDER_HEIGHTS = (1080, 720, 480)
+
+# Resumable pipeline stages, in order; each one's checkpoint depends on all earlier ones
+STAGES = ("download", "audio", "dead_time", "analysis", "clips")
+CHECKPOINT_FILE = "checkpoints.json"
+
+# Files the pipeline writes to its work directory: the only ones cleanup removes from a
+# user-supplied work_dir, together with the per-format, temp and partial files yt-dlp leaves
+WORK_FILES = ("video.mp4", "audio.wav", "analysis_media", "section.mp4", "concat_list.txt",
+              CHECKPOINT_FILE, CHECKPOINT_FILE + ".tmp")
+YTDLP_WORK_FILE_RE = re.compile(
+    r"(?:(?:video|section)(?:\.f\d+|\.temp)?\.(?:mp4|m4a|webm|mkv)|analysis_media(?:\.f\d+)?)"
+    r"(?:\.part(?:-Frag\d+)?|\.ytdl)?"
+)
+# Written to a work directory the pipeline created, so cleanup knows it may remove it
+WORK_DIR_MARKER = ".highlights_work_dir"
+HIGHLIGHT_COLUMNS = ['time', 'intensity', 'whistle_feature']
+
 
 class HighlightExtractor:
     """Class to extract highlights from basketball games based on audio peaks."""
 
-    def __init__(self, url, num_highlights=10, pre_buffer=5, post_buffer=5, output_dir="highlights"):
+    def __init__(self, url, num_highlights=10, pre_buffer=5, post_buffer=5, output_dir="highlights",
+                 skip_dead_time=False, search_mode="exhaustive", audio_profile="full",
+                 download_mode="full", encode_profile="default", ladder=False,
+                 store_path=None, game_id=None, game_round=None, work_dir=None,
+                 threshold_mode="exact"):
         """
         Initialize the highlight extractor.
         
@@ -32,13 +93,58 @@ class HighlightExtractor:
             pre_buffer (int): Seconds to include before the peak
             post_buffer (int): Seconds to include after the peak
             output_dir (str): Output directory for highlights
+            skip_dead_time (bool): Pre-scan for silence/black frames and skip them in analysis
+            search_mode (str): "exhaustive" analyzes every window, "coarse" only the windows
+                around loud regions nominated by a cheap loudness envelope
+            audio_profile (str): Decoding/feature profile from AUDIO_PROFILES ("full" or "fast")
+            download_mode (str): "full" downloads the whole video; "sections" downloads only the
+                audio for analysis, then just the highlight time ranges at full quality. Sources
+                without an audio-only rendition (e.g. a single MP4 file) would need the whole
+                file for the analysis anyway, so they are downloaded once in full instead
+            encode_profile (str): Clip encode profile from ENCODE_PROFILES
+            ladder (bool): Also produce 720p and 480p renditions of each clip in the same
+                ffmpeg invocation (one decode, several outputs)
+            store_path (str): SQLite highlight store to record clips in; clips already
+                recorded there (and still on disk) are not cut again
+            game_id (str): Game identifier used in the store (default: the URL)
+            game_round (str): Round label stored with the game, e.g. for "top of the round" queries
+            work_dir (str): Directory for intermediate files with per-stage checkpoints. It is
+                kept when a run fails, and a rerun with the same directory resumes after the
+                last completed stage and only cuts the missing clips. A completed run removes
+                only the files the pipeline wrote there (and the directory, if it created it
+                and nothing else is left). It must not contain output_dir. Default: a
+                temporary directory, removed after every run
+            threshold_mode (str): "exact" uses the 95th percentile of the game's energy and the
+                profile's fixed whistle threshold; "adaptive" detects and ranks peaks by energy
+                above a rolling local baseline, with thresholds from streaming quantile sketches
         """
         self.url = url
         self.num_highlights = num_highlights
         self.pre_buffer = pre_buffer
         self.post_buffer = post_buffer
         self.output_dir = output_dir
-        self.temp_dir = tempfile.mkdtemp()
+        self.skip_dead_time = skip_dead_time
+        self.search_mode = search_mode
+        self.threshold_mode = threshold_mode
+        self.audio_profile = AUDIO_PROFILES[audio_profile]
+        self.download_mode = download_mode
+        self.encode_profile = ENCODE_PROFILES[encode_profile]
+        self.ladder_heights = LADDER_HEIGHTS if ladder else ()
+        self.store_path = store_path
+        self.game_id = game_id or url
+        self.game_round = game_round
+        self.work_dir = work_dir
+        if work_dir:
+            if _is_within(output_dir, work_dir):
+                raise ValueError(f"Output directory {output_dir} must not be inside the work directory {work_dir}")
+            if not os.path.exists(work_dir):
+                os.makedirs(work_dir)
+                open(os.path.join(work_dir, WORK_DIR_MARKER), 'w').close()
+            # Also set when resuming in a directory an earlier run created
+            self.created_work_dir = os.path.exists(os.path.join(work_dir, WORK_DIR_MARKER))
+            self.temp_dir = work_dir
+        else:
+            self.temp_dir = tempfile.mkdtemp()
         
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
@@ -47,34 +153,230 @@ class HighlightExtractor:
         self.video_path = os.path.join(self.temp_dir, "video.mp4")
         self.audio_path = os.path.join(self.temp_dir, "audio.wav")
         
+        # Media the audio is decoded from: the full video, or the analysis rendition in sections mode
+        if download_mode == "sections":
+            self.analysis_path = os.path.join(self.temp_dir, "analysis_media")
+        else:
+            self.analysis_path = self.video_path
+        
+        # Set when sections mode found no audio-only rendition and downloaded the full video
+        self.sections_fallback = False
+        
         # Store extracted timestamps
         self.highlight_timestamps = []
+        
+        # Dead segments (start, end) in seconds, excluded from analysis
+        self.dead_segments = []
+        
+        # Highlight store, opened on first use; clips found there are reused instead of cut
+        self.store = None
+        self.reused_clips = set()
+        
+        # Stage checkpoints (only with a work_dir), and clips that failed in this run
+        self.checkpoint_path = os.path.join(work_dir, CHECKPOINT_FILE) if work_dir else None
+        self.checkpoints = self._load_checkpoints()
+        self.failed_clips = []
 
-    def download_video(self):
-        """Download the YouTube video using yt-dlp."""
-        print(f"Downloading video from {self.url}...")
+    def _log(self, message):
+        """Report progress. Subclasses can redirect messages away from stdout."""
+        print(message)
+
+    def _load_checkpoints(self):
+        """Read the checkpoints left in the work directory by an earlier run."""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self._log(f"Ignoring unreadable checkpoints ({e}); starting from scratch")
+            return {}
+
+    def _save_checkpoints(self):
+        """Write the checkpoints atomically, so a crash never leaves a half-written file."""
+        if not self.checkpoint_path:
+            return
+        
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.checkpoints, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _stage_config(self, stage):
+        """
+        Settings a stage's result depends on, including those of all earlier stages.
+        
+        A checkpoint only counts if it was written with the same settings, so changing
+        e.g. the number of highlights redoes the analysis but keeps the download.
+        """
+        settings = {
+            "download": {"url": self.url, "download_mode": self.download_mode},
+            "audio": {"sample_rate": self.audio_profile['sample_rate']},
+            "dead_time": {"skip_dead_time": self.skip_dead_time},
+            "analysis": {
+                "search_mode": self.search_mode,
+                "threshold_mode": self.threshold_mode,
+                "audio_profile": self.audio_profile,
+                "num_highlights": self.num_highlights,
+            },
+            "clips": {
+                "pre_buffer": self.pre_buffer,
+                "post_buffer": self.post_buffer,
+                "output_dir": os.path.abspath(self.output_dir),
+                "encode_profile": self.encode_profile,
+                "ladder_heights": self.ladder_heights,
+            },
+        }
+        config = {}
+        for name in STAGES[:STAGES.index(stage) + 1]:
+            config.update(settings[name])
+        
+        # Compare in JSON form (tuples become lists)
+        return json.loads(json.dumps(config))
+
+    def _stage_done(self, stage):
+        """True if a checkpoint shows the stage was completed with the current settings."""
+        checkpoint = self.checkpoints.get(stage)
+        return bool(checkpoint and checkpoint.get("done") and checkpoint["config"] == self._stage_config(stage))
+
+    def _mark_stage_done(self, stage, **data):
+        """
+        Record a completed stage, with any results later stages need.
+        
+        Checkpoints of later stages are dropped: they were computed from the
+        results this stage has just replaced.
+        """
+        if not self.checkpoint_path:
+            return
+        
+        for later_stage in STAGES[STAGES.index(stage) + 1:]:
+            self.checkpoints.pop(later_stage, None)
+        self.checkpoints[stage] = {"config": self._stage_config(stage), "done": True, **data}
+        self._save_checkpoints()
+
+    def _resume_stage(self, stage):
+        """
+        Restore a completed stage's results from its checkpoint.
+        
+        Returns:
+            bool: True if the stage can be skipped
+        """
+        if not self._stage_done(stage):
+            return False
+        
+        checkpoint = self.checkpoints[stage]
+        if stage == "download" and checkpoint.get("sections_fallback"):
+            self._use_full_video()
+        
+        # Files a stage produced must still be there
+        required = {"download": self.analysis_path, "audio": self.audio_path}.get(stage)
+        if required and not os.path.exists(required):
+            return False
+        
+        if stage == "dead_time":
+            self.dead_segments = [tuple(segment) for segment in checkpoint["dead_segments"]]
+        elif stage == "analysis":
+            self.highlight_timestamps = pd.DataFrame(checkpoint["highlights"], columns=HIGHLIGHT_COLUMNS)
         
-        # Command to download the video with yt-dlp
-        # Using format 'bestvideo[height<=1080]+bestaudio/best' to get highest quality up to 1080p
-        cmd = [
+        self._log(f"Resuming: {stage} already completed")
+        return True
+
+    def _checkpoint_data(self, stage):
+        """Results of a stage that are saved with its checkpoint."""
+        if stage == "download" and self.sections_fallback:
+            return {"sections_fallback": True}
+        if stage == "dead_time":
+            return {"dead_segments": self.dead_segments}
+        if stage == "analysis":
+            return {"highlights": self.highlight_timestamps[HIGHLIGHT_COLUMNS].to_dict('records')}
+        return {}
+
+    def _download_cmd(self):
+        """yt-dlp command downloading the full video."""
+        # Using format 'bestvideo[height<=1080]+bestaudio/best' to get highest quality up to 1080p.
+        # A file left in the work dir by an earlier run may be another game's, so it (and any
+        # partial download) is replaced rather than skipped as "already downloaded"
+        return [
             "yt-dlp",
             "--output", self.video_path,
-            "--format", "bestvideo[height<=1080]+bestaudio/best[ext=mp4]/best",
+            "--format", VIDEO_FORMAT,
             "--merge-output-format", "mp4",
+            "--force-overwrites",
+            self.url
+        ]
+
+    def _analysis_media_cmd(self):
+        """yt-dlp command downloading only the audio track for analysis."""
+        return [
+            "yt-dlp",
+            "--output", self.analysis_path,
+            "--format", ANALYSIS_FORMAT,
+            "--force-overwrites",
             self.url
         ]
+
+    def download_video(self):
+        """
+        Download the YouTube video using yt-dlp.
+        
+        In sections mode only the audio track is downloaded here; the highlight clips
+        are fetched later by extract_highlights. Without an audio-only rendition the
+        full video is downloaded once and the clips are cut from it, as in full mode.
+        """
+        if self.download_mode == "sections" and not self.sections_fallback:
+            downloaded = self._download_analysis_media()
+            if not self.sections_fallback:
+                return downloaded
+        
+        self._log(f"Downloading video from {self.url}...")
         
         try:
-            subprocess.run(cmd, check=True)
-            print("Video downloaded successfully!")
+            subprocess.run(self._download_cmd(), check=True)
+            self._log("Video downloaded successfully!")
             
             # Validate the video resolution
             self._validate_video_resolution()
             return True
         except subprocess.CalledProcessError as e:
-            print(f"Error downloading video: {e}")
+            self._log(f"Error downloading video: {e}")
+            return False
+
+    def _download_analysis_media(self):
+        """
+        Download only the audio track for analysis.
+        
+        Switches to the full video (see _use_full_video) if the source has no
+        audio-only rendition.
+        """
+        self._log(f"Downloading audio for analysis from {self.url}...")
+        
+        try:
+            subprocess.run(self._analysis_media_cmd(), check=True, stderr=subprocess.PIPE, text=True)
+            self._log("Analysis audio downloaded successfully!")
+            return True
+        except subprocess.CalledProcessError as e:
+            if FORMAT_UNAVAILABLE in e.stderr:
+                self._use_full_video()
+            else:
+                self._log(f"Error downloading analysis audio: {e}\n{e.stderr[-2000:]}")
             return False
 
+    def _use_full_video(self):
+        """
+        Fall back from sections mode to one full download.
+        
+        Decoding the audio of a muxed file means downloading all of it, so fetching
+        the highlight sections afterwards would only add traffic; the clips are cut
+        from the downloaded video instead.
+        """
+        if not self.sections_fallback:
+            self._log("No audio-only rendition available; downloading the full video once instead of sections")
+        self.sections_fallback = True
+        self.analysis_path = self.video_path
+
     def _validate_video_resolution(self):
         """Validate the resolution of the downloaded video."""
         try:
@@ -88,40 +390,91 @@ class HighlightExtractor:
             if video_stream:
                 width = int(video_stream['width'])
                 height = int(video_stream['height'])
-                print(f"Downloaded video resolution: {width}x{height}")
+                self._log(f"Downloaded video resolution: {width}x{height}")
                 
                 # Check if the resolution is 1080p or higher
                 if height >= 1080:
-                    print("Video quality: 1080p or higher (Excellent)")
+                    self._log("Video quality: 1080p or higher (Excellent)")
                 elif height >= 720:
-                    print("Video quality: 720p (Good)")
+                    self._log("Video quality: 720p (Good)")
                 elif height >= 480:
-                    print("Video quality: 480p (Standard)")
+                    self._log("Video quality: 480p (Standard)")
                 else:
-                    print("Video quality: Below 480p (Low)")
-                    print("Warning: The video quality is lower than recommended.")
+                    self._log("Video quality: Below 480p (Low)")
+                    self._log("Warning: The video quality is lower than recommended.")
             else:
-                print("Could not determine video resolution.")
+                self._log("Could not determine video resolution.")
         except Exception as e:
-            print(f"Error validating video resolution: {e}")
+            self._log(f"Error validating video resolution: {e}")
+
+    def _extract_audio_stream(self):
+        """ffmpeg-python stream decoding the analysis media to a mono PCM WAV file."""
+        return ffmpeg.input(self.analysis_path).output(
+            self.audio_path, 
+            acodec='pcm_s16le', 
+            ac=1, 
+            ar=self.audio_profile['sample_rate']
+        )
 
     def extract_audio(self):
         """Extract audio from the video using FFmpeg."""
-        print("Extracting audio from video...")
+        self._log("Extracting audio from video...")
         
         try:
             # Command to extract audio using ffmpeg
-            ffmpeg.input(self.video_path).output(
-                self.audio_path, 
-                acodec='pcm_s16le', 
-                ac=1, 
-                ar=22050
-            ).run(quiet=True, overwrite_output=True)
-            
-            print("Audio extracted successfully!")
+            self._extract_audio_stream().run(quiet=True, overwrite_output=True)
+            
+            self._log("Audio extracted successfully!")
             return True
         except ffmpeg.Error as e:
-            print(f"Error extracting audio: {e}")
+            self._log(f"Error extracting audio: {e}")
+            return False
+
+    def _dead_time_scan_cmd(self):
+        """ffmpeg command for the coarse silence, black-frame and loudness-profile pre-scan."""
+        return [
+            "ffmpeg",
+            "-hide_banner",
+            "-nostats",
+            "-skip_frame", "nokey",  # Coarse pass: decode keyframes only
+            "-i", self.analysis_path,
+            "-vf", f"scale=160:-2,blackdetect=d={BLACK_MIN_DURATION}:pic_th={BLACK_PICTURE_THRESHOLD}",
+            "-af", f"silencedetect=noise={SILENCE_NOISE_DB}dB:d={SILENCE_MIN_DURATION},ebur128",
+            "-f", "null",
+            "-"
+        ]
+
+    def _store_dead_segments(self, scan_output):
+        """Parse the pre-scan output into merged dead segments."""
+        duration = self._audio_duration()
+        
+        segments = (parse_silencedetect(scan_output, duration) + parse_blackdetect(scan_output)
+                    + flat_loudness_segments(*parse_ebur128(scan_output)))
+        self.dead_segments = merge_segments(segments, DEAD_SEGMENT_MERGE_GAP)
+        
+        dead_time = sum(end - start for start, end in self.dead_segments)
+        self._log(f"Found {len(self.dead_segments)} dead segments ({dead_time:.0f}s of {duration:.0f}s)")
+
+    def detect_dead_segments(self):
+        """
+        Find dead time (ad breaks, halftime shows, pre-game) with a coarse ffmpeg pre-scan.
+        
+        Only keyframes are decoded and downscaled for black-frame detection, while the
+        audio track goes through silencedetect and ebur128 in the same pass; the
+        loudness profile flags the compressed, constant-loudness stretches of ads and
+        halftime shows, which are neither silent nor black. Segments found by any
+        filter are merged and stored in self.dead_segments. Runs after extract_audio,
+        which provides the game duration.
+        """
+        self._log("Scanning for dead time (silence, black frames and flat loudness)...")
+        
+        try:
+            result = subprocess.run(self._dead_time_scan_cmd(), check=True, capture_output=True, text=True)
+            self._store_dead_segments(result.stderr)
+            return True
+        except (subprocess.CalledProcessError, wave.Error, OSError) as e:
+            self._log(f"Error scanning for dead time: {e}")
+            self.dead_segments = []
             return False
 
     def analyze_audio(self):
@@ -131,175 +484,225 @@ class HighlightExtractor:
         Ensures highlights are at least 1 minute apart.
         Returns true if analysis was successful.
         """
-        print("Analyzing audio for peak moments...")
+        self._log("Analyzing audio for peak moments...")
         
         try:
-            # Open the WAV file
-            with wave.open(self.audio_path, 'rb') as wav_file:
-                # Get basic information
-                n_channels = wav_file.getnchannels()
-                sample_width = wav_file.getsampwidth()
-                frame_rate = wav_file.getframerate()
-                n_frames = wav_file.getnframes()
-                
-                # Read all frames at once
-                binary_data = wav_file.readframes(n_frames)
-            
-            # Convert binary data to numpy array (assuming 16-bit PCM, which is common)
-            if sample_width == 2:  # 16-bit audio
-                dtype = np.int16
-            elif sample_width == 4:  # 32-bit audio
-                dtype = np.int32
-            else:
-                raise ValueError(f"Unsupported sample width: {sample_width}")
-            
-            # Convert binary data to numpy array
-            samples = np.frombuffer(binary_data, dtype=dtype)
-            
-            # If stereo, convert to mono by averaging channels
-            if n_channels == 2:
-                samples = samples.reshape(-1, 2).mean(axis=1)
-            
-            # Normalize to -1.0 to 1.0
-            samples = samples / np.iinfo(dtype).max
+            samples, frame_rate = load_wav_samples(self.audio_path)
             
             # Calculate RMS energy in windows
             frame_length = int(frame_rate * 0.5)  # 0.5 second windows
             hop_length = int(frame_rate * 0.1)    # 0.1 second hop
             
-            # Calculate energy
-            energy = []
-            times = []
+            frame_starts = np.arange(0, len(samples) - frame_length, hop_length)
+            times = frame_starts / frame_rate
             
-            # Prepare arrays for spectral features
-            # Referee whistles typically have strong energy in 2000-4000 Hz range
-            whistle_feature = []
+            # Windows inside dead segments (ad breaks, halftime) are not analyzed at all
+            live = ~segments_mask(times, self.dead_segments, frame_length / frame_rate)
+            if not live.any():
+                raise ValueError("No audio left to analyze after skipping dead time")
             
-            for i in range(0, len(samples) - frame_length, hop_length):
-                chunk = samples[i:i + frame_length]
-                
-                # Calculate RMS energy
-                rms = np.sqrt(np.mean(chunk**2))
-                energy.append(rms)
-                times.append(i / frame_rate)
-                
-                # Calculate frequency domain features - FFT
-                fft_result = np.fft.rfft(chunk * np.hamming(len(chunk)))
-                fft_magnitude = np.abs(fft_result)
+            analyzed = live
+            if self.search_mode == "coarse":
+                # Coarse pass: nominate loud regions from a 1 s block envelope of decimated audio
+                block_times, envelope_db = coarse_envelope(samples, frame_rate)
+                block_live = ~segments_mask(block_times, self.dead_segments, COARSE_BLOCK_SECONDS)
+                candidates = nominate_candidate_regions(block_times[block_live], envelope_db[block_live])
                 
-                # Calculate frequency bins
-                freq_bins = np.fft.rfftfreq(frame_length, 1/frame_rate)
-                
-                # Calculate whistle feature - energy ratio in whistle frequency range
-                # Referee whistles typically have strong components between 2000-4000 Hz
-                whistle_range_mask = (freq_bins >= 2000) & (freq_bins <= 4000)
-                total_energy = np.sum(fft_magnitude)
-                
-                if total_energy > 0:
-                    whistle_energy_ratio = np.sum(fft_magnitude[whistle_range_mask]) / total_energy
-                else:
-                    whistle_energy_ratio = 0
-                    
-                whistle_feature.append(whistle_energy_ratio)
+                # Fine pass only runs on windows inside the candidate regions
+                analyzed = live & segments_mask(times, candidates, frame_length / frame_rate)
+                self._log(f"Coarse search: analyzing {np.count_nonzero(analyzed)} of {len(times)} windows "
+                          f"in {len(candidates)} candidate regions")
             
-            energy = np.array(energy)
-            times = np.array(times)
-            whistle_feature = np.array(whistle_feature)
+            # Calculate energy and whistle feature
+            # Referee whistles typically have strong energy in 2000-4000 Hz range
+            energy = np.zeros(len(times))
+            whistle_feature = np.zeros(len(times))
+            energy[analyzed], whistle_feature[analyzed] = compute_window_features(
+                samples, frame_rate, frame_length, frame_starts[analyzed],
+                whistle_method=self.audio_profile['whistle_method']
+            )
             
             # Convert to dB scale
             eps = 1e-10  # to avoid log(0)
             energy_db = 20.0 * np.log10(energy + eps)
             
+            # Floor skipped windows to the quietest analyzed window so they can never be selected
+            energy_db[~analyzed] = energy_db[analyzed].min()
+            
+            if self.threshold_mode == "adaptive":
+                blocks = (block_times[block_live], envelope_db[block_live]) if self.search_mode == "coarse" else None
+                baseline_db, peak_threshold, WHISTLE_THRESHOLD = self._adaptive_thresholds(
+                    energy_db, whistle_feature, times, analyzed, hop_length / frame_rate, blocks
+                )
+                detection_db = energy_db - baseline_db
+                detection_db[~analyzed] = detection_db[analyzed].min()
+                self._log(f"Adaptive thresholds: {peak_threshold:.1f} dB above the local baseline, "
+                          f"whistle ratio {WHISTLE_THRESHOLD:.2f}")
+            else:
+                baseline_db = None
+                detection_db = energy_db
+                
+                # The exhaustive pass has every live window for its percentile threshold;
+                # the coarse pass approximates it with the same percentile of the block envelope
+                if self.search_mode == "coarse":
+                    peak_threshold = np.percentile(envelope_db[block_live], 95)
+                else:
+                    peak_threshold = np.percentile(energy_db[live], 95)
+                
+                # Whistles typically have high energy in the 2000-4000 Hz range
+                # The threshold depends on how the audio profile measures the whistle band
+                WHISTLE_THRESHOLD = self.audio_profile['whistle_threshold']
+            
             # Find peaks (loudest moments)
             # Increased minimum distance between peaks to ensure at least 1 minute separation
             # 1 minute = 60 seconds, so we need distance = 60 / hop_length = 60 / 0.1 = 600 frames
             min_frames_between_peaks = int(60 / (hop_length / frame_rate))  # 1 minute in frames
             
-            peaks, _ = find_peaks(energy_db, height=np.percentile(energy_db, 95), 
+            peaks, _ = find_peaks(detection_db, height=peak_threshold, 
                                  distance=min_frames_between_peaks)
             
             # Create dataframe with peaks and their intensities
+            # (score is the value peaks are ranked by: intensity, or intensity above the baseline)
             peak_df = pd.DataFrame({
                 'time': times[peaks],
                 'intensity': energy_db[peaks],
-                'whistle_feature': whistle_feature[peaks]
+                'whistle_feature': whistle_feature[peaks],
+                'score': detection_db[peaks]
             })
             
             # Create a visualization of whistle detection
-            plt.figure(figsize=(15, 10))
+            # (Figure objects instead of pyplot state, so concurrent analyses don't share figures)
+            fig = Figure(figsize=(15, 10))
             
             # Plot 1: Audio energy
-            plt.subplot(2, 1, 1)
-            plt.plot(times, energy_db)
-            plt.scatter(peak_df['time'], peak_df['intensity'], color='r')
-            plt.xlabel('Time (s)')
-            plt.ylabel('Energy (dB)')
-            plt.title('Audio Energy and Detected Peaks (Minimum 1-minute separation)')
+            ax = fig.add_subplot(2, 1, 1)
+            ax.plot(times, energy_db)
+            if baseline_db is not None:
+                ax.plot(times, baseline_db, color='k', label='Local baseline')
+                ax.legend()
+            ax.scatter(peak_df['time'], peak_df['intensity'], color='r')
+            for start, end in self.dead_segments:
+                ax.axvspan(start, end, color='grey', alpha=0.3)
+            ax.set_xlabel('Time (s)')
+            ax.set_ylabel('Energy (dB)')
+            ax.set_title('Audio Energy and Detected Peaks (Minimum 1-minute separation)')
             
             # Plot 2: Whistle feature
-            plt.subplot(2, 1, 2)
-            plt.plot(times, whistle_feature)
-            plt.scatter(peak_df['time'], peak_df['whistle_feature'], color='g')
-            plt.xlabel('Time (s)')
-            plt.ylabel('Whistle Energy Ratio')
-            plt.title('Whistle Energy Ratio (Higher values indicate likely whistle)')
+            ax = fig.add_subplot(2, 1, 2)
+            ax.plot(times, whistle_feature)
+            ax.axhline(WHISTLE_THRESHOLD, color='orange', linestyle='--')
+            ax.scatter(peak_df['time'], peak_df['whistle_feature'], color='g')
+            ax.set_xlabel('Time (s)')
+            ax.set_ylabel('Whistle Energy Ratio')
+            ax.set_title('Whistle Energy Ratio (Higher values indicate likely whistle)')
             
-            plt.tight_layout()
-            plt.savefig(os.path.join(self.output_dir, 'audio_whistle_analysis.png'))
+            fig.tight_layout()
+            fig.savefig(os.path.join(self.output_dir, 'audio_whistle_analysis.png'))
             
             # Filter out likely whistle sounds
-            # Whistles typically have high energy in the 2000-4000 Hz range
-            # We'll consider sounds with whistle_feature > 0.4 as likely whistles
-            WHISTLE_THRESHOLD = 0.4
             whistle_peaks = peak_df[peak_df['whistle_feature'] > WHISTLE_THRESHOLD]
             non_whistle_peaks = peak_df[peak_df['whistle_feature'] <= WHISTLE_THRESHOLD]
             
-            print(f"Found {len(peak_df)} total peaks")
-            print(f"Filtered out {len(whistle_peaks)} likely whistle sounds")
-            print(f"Remaining {len(non_whistle_peaks)} highlight candidates")
+            self._log(f"Found {len(peak_df)} total peaks")
+            self._log(f"Filtered out {len(whistle_peaks)} likely whistle sounds")
+            self._log(f"Remaining {len(non_whistle_peaks)} highlight candidates")
             
-            # Sort by intensity (loudest first) and take top N
-            non_whistle_peaks = non_whistle_peaks.sort_values('intensity', ascending=False).reset_index(drop=True)
-            self.highlight_timestamps = non_whistle_peaks.head(self.num_highlights)[['time', 'intensity']]
+            # Sort by score (loudest first) and take top N
+            non_whistle_peaks = non_whistle_peaks.sort_values('score', ascending=False).reset_index(drop=True)
+            self.highlight_timestamps = non_whistle_peaks.head(self.num_highlights)[HIGHLIGHT_COLUMNS]
             
             # Generate another visualization showing filtered peaks
-            plt.figure(figsize=(15, 5))
-            plt.plot(times, energy_db, alpha=0.7)
+            fig = Figure(figsize=(15, 5))
+            ax = fig.add_subplot(1, 1, 1)
+            ax.plot(times, energy_db, alpha=0.7)
             
             # Plot all peaks in red
-            plt.scatter(peak_df['time'], peak_df['intensity'], color='r', label='All Peaks', alpha=0.5)
+            ax.scatter(peak_df['time'], peak_df['intensity'], color='r', label='All Peaks', alpha=0.5)
             
             # Plot filtered out whistle peaks in orange
             if len(whistle_peaks) > 0:
-                plt.scatter(whistle_peaks['time'], whistle_peaks['intensity'], color='orange', 
+                ax.scatter(whistle_peaks['time'], whistle_peaks['intensity'], color='orange', 
                            marker='x', s=100, label='Filtered Whistle Peaks')
             
             # Plot selected non-whistle peaks in green
             if len(self.highlight_timestamps) > 0:
-                plt.scatter(self.highlight_timestamps['time'], self.highlight_timestamps['intensity'], 
+                ax.scatter(self.highlight_timestamps['time'], self.highlight_timestamps['intensity'], 
                            color='g', marker='o', s=100, label='Selected Highlights')
             
-            plt.xlabel('Time (s)')
-            plt.ylabel('Energy (dB)')
-            plt.title('Audio Peaks with Whistle Detection and 1-minute Minimum Separation')
-            plt.legend()
-            plt.tight_layout()
-            plt.savefig(os.path.join(self.output_dir, 'audio_filtered_peaks.png'))
+            ax.set_xlabel('Time (s)')
+            ax.set_ylabel('Energy (dB)')
+            ax.set_title('Audio Peaks with Whistle Detection and 1-minute Minimum Separation')
+            ax.legend()
+            fig.tight_layout()
+            fig.savefig(os.path.join(self.output_dir, 'audio_filtered_peaks.png'))
             
-            print(f"Selected {len(self.highlight_timestamps)} peak moments for highlight extraction.")
+            self._log(f"Selected {len(self.highlight_timestamps)} peak moments for highlight extraction.")
             return True
         
         except Exception as e:
-            print(f"Error analyzing audio: {e}")
+            self._log(f"Error analyzing audio: {e}")
             return False
 
-    def extract_highlights(self):
-        """Extract video clips around the peak moments."""
-        print("Extracting highlight clips...")
+    def _adaptive_thresholds(self, energy_db, whistle_feature, times, analyzed, step, blocks=None):
+        """
+        Local baseline and thresholds for the adaptive threshold mode.
+        
+        The analyzed windows are streamed through AdaptiveThresholds in time order, the
+        same way a live analyzer would see them. In the coarse search mode the baseline
+        and the energy threshold come from the block envelope instead, which covers the
+        whole game rather than just the candidate regions.
+        
+        Returns:
+            tuple: (baseline_db per window, energy threshold above the baseline, whistle threshold)
+        """
+        if blocks is None:
+            thresholds = AdaptiveThresholds(step, self.audio_profile['whistle_headroom'])
+            baseline_db = np.empty(len(energy_db))
+            for i in np.flatnonzero(analyzed):
+                baseline_db[i] = energy_db[i] - thresholds.update(energy_db[i], whistle_feature[i])
+            
+            # Skipped windows take the baseline of the closest analyzed window before them
+            analyzed_times = times[analyzed]
+            baseline_db = baseline_db[analyzed][np.maximum(np.searchsorted(analyzed_times, times, side='right') - 1, 0)]
+        else:
+            block_times, block_db = blocks
+            thresholds = AdaptiveThresholds(COARSE_BLOCK_SECONDS, self.audio_profile['whistle_headroom'])
+            block_baseline = [db - thresholds.update_energy(db) for db in block_db]
+            for whistle in whistle_feature[analyzed]:
+                thresholds.update_whistle(whistle)
+            baseline_db = np.interp(times, block_times, block_baseline)
+        
+        return baseline_db, thresholds.energy_threshold(), thresholds.whistle_threshold()
+
+    def _audio_duration(self):
+        """Duration of the decoded analysis audio in seconds."""
+        with wave.open(self.audio_path, 'rb') as wav_file:
+            return wav_file.getnframes() / wav_file.getframerate()
+
+    def _media_duration(self):
+        """Duration of the game in seconds."""
+        if self.download_mode == "sections":
+            # The decoded analysis audio covers the whole game (and there may be no full video)
+            return self._audio_duration()
         
-        clip_paths = []
         video_info = ffmpeg.probe(self.video_path)
-        video_duration = float(video_info['format']['duration'])
+        return float(video_info['format']['duration'])
+
+    def _clip_plan(self, video_duration):
+        """
+        Plan the highlight clips.
+        
+        With checkpoints, the plan is saved before any clip is cut and reused on resume,
+        so a clip interrupted half-way is rewritten under the same name.
+        
+        Returns:
+            list: (clip number, start time, end time, output path) per highlight
+        """
+        checkpoint = self.checkpoints.get("clips")
+        if checkpoint and checkpoint["config"] == self._stage_config("clips"):
+            return [tuple(clip) for clip in checkpoint["plan"]]
+        
+        plan = []
         
         for idx, row in self.highlight_timestamps.iterrows():
             peak_time = row['time']
@@ -307,104 +710,334 @@ class HighlightExtractor:
             # Calculate start and end time with buffer
             start_time = max(0, peak_time - self.pre_buffer)
             end_time = min(video_duration, peak_time + self.post_buffer)
-            duration = end_time - start_time
             
-            # Format timestamp for filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = os.path.join(self.output_dir, f"highlight_{idx+1}_{timestamp}.mp4")
+            # Reuse a clip of the same range cut by an earlier run with the same encode settings
+            output_path = self._find_stored_clip(start_time, end_time)
+            if output_path:
+                self.reused_clips.add(output_path)
+            else:
+                # Format timestamp for filename
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                output_path = os.path.join(self.output_dir, f"highlight_{idx+1}_{timestamp}.mp4")
+            plan.append((idx + 1, start_time, end_time, output_path))
+        
+        if self.checkpoint_path:
+            self.checkpoints["clips"] = {"config": self._stage_config("clips"), "plan": plan, "completed": []}
+            self._save_checkpoints()
+        
+        return plan
+
+    def _clip_done(self, clip_number, output_path):
+        """True if the clip was already cut, by an earlier (interrupted) run or a stored result."""
+        if output_path in self.reused_clips:
+            return True
+        checkpoint = self.checkpoints.get("clips", {})
+        return clip_number in checkpoint.get("completed", []) and os.path.exists(output_path)
+
+    def _mark_clip_done(self, clip_number, plan):
+        """Checkpoint a finished clip; the clips stage is done once every clip is."""
+        if not self.checkpoint_path:
+            return
+        
+        checkpoint = self.checkpoints["clips"]
+        if clip_number not in checkpoint["completed"]:
+            checkpoint["completed"].append(clip_number)
+        checkpoint["done"] = len(checkpoint["completed"]) == len(plan)
+        self._save_checkpoints()
+
+    def _open_store(self):
+        """Open the highlight store (if configured) and register the game."""
+        if self.store_path and self.store is None:
+            self.store = HighlightStore(self.store_path)
+            self.store.add_game(self.game_id, url=self.url, game_round=self.game_round)
+        return self.store
+
+    def _encode_settings(self):
+        """Encode profile and ladder renditions, as stored with each clip."""
+        return json.dumps({"encode_profile": self.encode_profile, "ladder_heights": list(self.ladder_heights)},
+                          sort_keys=True)
+
+    def _find_stored_clip(self, start_time, end_time):
+        """
+        A clip of this range in the highlight store, cut with the current encode settings
+        and with all its ladder renditions still on disk, or None.
+        """
+        if not self.store:
+            return None
+        
+        output_path = self.store.find_clip(self.game_id, start_time, end_time, self._encode_settings())
+        if output_path and all(os.path.exists(self._rendition_path(output_path, height))
+                               for height in self.ladder_heights[1:]):
+            return output_path
+        return None
+
+    def _record_highlight(self, clip_number, start_time, end_time, output_path):
+        """Record an extracted clip in the highlight store, if one is configured."""
+        if not self.store:
+            return
+        
+        row = self.highlight_timestamps.iloc[clip_number - 1]
+        self.store.add_highlight(
+            self.game_id,
+            peak_time=row['time'],
+            start_time=start_time,
+            end_time=end_time,
+            intensity=row['intensity'],
+            whistle_score=row['whistle_feature'],
+            clip_path=output_path,
+            rank=clip_number,
+            encode_settings=self._encode_settings()
+        )
+
+    @staticmethod
+    def _rendition_path(output_path, height):
+        """Path of one ladder rendition, e.g. highlight_1_<timestamp>_720p.mp4."""
+        root, ext = os.path.splitext(output_path)
+        return f"{root}_{height}p{ext}"
+
+    def _encode_cmd(self, input_path, output_path, start_time=None, duration=None):
+        """
+        ffmpeg command encoding a clip with the selected encode profile.
+        
+        With the ladder enabled the source is decoded once and split into one scaled
+        output per rendition height (never upscaling); the first rendition is written
+        to output_path and the others next to it with a height suffix.
+        """
+        cmd = ["ffmpeg", "-y", "-loglevel", "error"]
+        if start_time is not None:
+            cmd += ["-ss", f"{start_time:.3f}", "-t", f"{duration:.3f}"]
+        cmd += ["-i", input_path]
+        
+        codec_args = [
+            "-c:v", "libx264",
+            "-preset", self.encode_profile['preset'],
+            "-crf", str(self.encode_profile['crf']),
+            "-c:a", "aac"
+        ]
+        
+        if not self.ladder_heights:
+            return cmd + codec_args + [output_path]
+        
+        labels = [f"[v{i}]" for i in range(len(self.ladder_heights))]
+        filters = [f"[0:v]split={len(labels)}{''.join(labels)}"]
+        filters += [
+            f"{label}scale=-2:'min({height},ih)'[out{i}]"
+            for i, (label, height) in enumerate(zip(labels, self.ladder_heights))
+        ]
+        cmd += ["-filter_complex", ";".join(filters)]
+        
+        for i, height in enumerate(self.ladder_heights):
+            path = output_path if i == 0 else self._rendition_path(output_path, height)
+            cmd += ["-map", f"[out{i}]", "-map", "0:a?"] + codec_args + [path]
+        
+        return cmd
+
+    def _clip_cmds(self, start_time, end_time, output_path):
+        """Commands producing one highlight clip, run in order."""
+        if self.download_mode != "sections" or self.sections_fallback:
+            # Extract clip using ffmpeg
+            return [self._encode_cmd(self.video_path, output_path, start_time, end_time - start_time)]
+        
+        # Fetch just this time range of the full-quality video; yt-dlp already re-encodes
+        # at the cuts, so a second encode only runs for a non-default profile or the ladder
+        reencode = self.ladder_heights or self.encode_profile != ENCODE_PROFILES["default"]
+        section_path = os.path.join(self.temp_dir, "section.mp4") if reencode else output_path
+        
+        cmds = [[
+            "yt-dlp",
+            "--quiet",
+            "--output", section_path,
+            "--format", VIDEO_FORMAT,
+            "--merge-output-format", "mp4",
+            "--download-sections", f"*{start_time:.2f}-{end_time:.2f}",
+            "--force-keyframes-at-cuts",
+            "--force-overwrites",
+            self.url
+        ]]
+        if reencode:
+            cmds.append(self._encode_cmd(section_path, output_path))
+        return cmds
+
+    def extract_highlights(self):
+        """Extract video clips around the peak moments."""
+        self._log("Extracting highlight clips...")
+        
+        clip_paths = []
+        self.failed_clips = []
+        self._open_store()
+        plan = self._clip_plan(self._media_duration())
+        
+        for clip_number, start_time, end_time, output_path in plan:
             clip_paths.append(output_path)
             
+            if self._clip_done(clip_number, output_path):
+                self._record_highlight(clip_number, start_time, end_time, output_path)
+                self._mark_clip_done(clip_number, plan)
+                self._log(f"Highlight {clip_number}/{len(plan)} already extracted: {output_path}")
+                continue
+            
             try:
-                # Extract clip using ffmpeg
-                ffmpeg.input(self.video_path, ss=start_time, t=duration).output(
-                    output_path, 
-                    # c='copy'
-                ).run(quiet=True, overwrite_output=True)
+                for cmd in self._clip_cmds(start_time, end_time, output_path):
+                    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
                 
-                print(f"Extracted highlight {idx+1}/{len(self.highlight_timestamps)}")
+                self._record_highlight(clip_number, start_time, end_time, output_path)
+                self._mark_clip_done(clip_number, plan)
+                self._log(f"Extracted highlight {clip_number}/{len(plan)}")
             
-            except ffmpeg.Error as e:
-                print(f"Error extracting highlight {idx+1}: {e}")
+            except subprocess.CalledProcessError as e:
+                self.failed_clips.append(clip_number)
+                self._log(f"Error extracting highlight {clip_number}: {e}")
         
         return clip_paths
 
-    def compile_highlights(self, clip_paths):
-        """Compile all highlight clips into a single video."""
-        print("Compiling highlights into a single video...")
-        
-        # Create a text file listing all clips
+    def _write_concat_list(self, clip_paths):
+        """Write the ffmpeg concat demuxer list for the clips and return its path."""
         concat_file = os.path.join(self.temp_dir, "concat_list.txt")
         with open(concat_file, 'w') as f:
             for clip_path in clip_paths:
                 f.write(f"file '{os.path.abspath(clip_path)}'\n")
+        return concat_file
+
+    def _compile_cmd(self, concat_file, output_path):
+        """ffmpeg command concatenating the clips without re-encoding."""
+        return [
+            "ffmpeg", 
+            "-f", "concat", 
+            "-safe", "0", 
+            "-i", concat_file, 
+            "-c", "copy", 
+            output_path
+        ]
+
+    def _compilation_path(self):
+        """Output path for the compiled video."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.output_dir, f"highlights_compilation_{timestamp}.mp4")
+
+    def compile_highlights(self, clip_paths):
+        """Compile all highlight clips into a single video."""
+        self._log("Compiling highlights into a single video...")
+        
+        # Create a text file listing all clips
+        concat_file = self._write_concat_list(clip_paths)
         
         # Output path for the compiled video
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_path = os.path.join(self.output_dir, f"highlights_compilation_{timestamp}.mp4")
+        output_path = self._compilation_path()
         
         try:
             # Concatenate clips using ffmpeg
-            subprocess.run([
-                "ffmpeg", 
-                "-f", "concat", 
-                "-safe", "0", 
-                "-i", concat_file, 
-                "-c", "copy", 
-                output_path
-            ], check=True)
-            
-            print(f"Compilation completed: {output_path}")
+            subprocess.run(self._compile_cmd(concat_file, output_path), check=True)
+            
+            self._log(f"Compilation completed: {output_path}")
             return output_path
         
         except subprocess.CalledProcessError as e:
-            print(f"Error compiling highlights: {e}")
+            self._log(f"Error compiling highlights: {e}")
             return None
 
-    def cleanup(self):
-        """Clean up temporary files."""
-        print("Cleaning up temporary files...")
+    def cleanup(self, keep_work_dir=False):
+        """
+        Clean up temporary files.
+        
+        Args:
+            keep_work_dir (bool): Keep the work directory and its checkpoints for a resume
+        """
+        if self.store:
+            self.store.close()
+            self.store = None
+        
+        if keep_work_dir:
+            self._log(f"Keeping work directory for resume: {self.temp_dir}")
+            return
+        
+        self._log("Cleaning up temporary files...")
         try:
-            shutil.rmtree(self.temp_dir)
-            print("Cleanup completed.")
+            if self.work_dir:
+                self._remove_work_files()
+            else:
+                shutil.rmtree(self.temp_dir)
+            self._log("Cleanup completed.")
         except Exception as e:
-            print(f"Error during cleanup: {e}")
+            self._log(f"Error during cleanup: {e}")
+
+    def _remove_work_files(self):
+        """
+        Remove what the pipeline wrote to a user-supplied work directory.
+        
+        Other files are left alone, and the directory itself is only removed if the
+        pipeline created it (in this or an earlier run) and it is empty afterwards.
+        """
+        for name in os.listdir(self.work_dir):
+            path = os.path.join(self.work_dir, name)
+            if (name in WORK_FILES or YTDLP_WORK_FILE_RE.fullmatch(name)) and os.path.isfile(path):
+                os.remove(path)
+        
+        if self.created_work_dir and os.listdir(self.work_dir) == [WORK_DIR_MARKER]:
+            os.remove(os.path.join(self.work_dir, WORK_DIR_MARKER))
+            os.rmdir(self.work_dir)
+
+    def _run_resumable(self, stage, step):
+        """Run a pipeline step unless its checkpoint shows it already completed."""
+        if self._resume_stage(stage):
+            return True
+        if not step():
+            return False
+        self._mark_stage_done(stage, **self._checkpoint_data(stage))
+        return True
 
     def run(self, compile_clips=True):
-        """Run the entire highlight extraction pipeline."""
+        """
+        Run the entire highlight extraction pipeline.
+        
+        With a work_dir, completed stages are checkpointed; if anything fails the
+        work directory is kept and the next run resumes from there.
+        """
         success = True
+        complete = False
         clip_paths = []
         
         try:
             # Step 1: Download the video
-            if not self.download_video():
+            if not self._run_resumable("download", self.download_video):
                 return False
             
             # Step 2: Extract audio
-            if not self.extract_audio():
+            if not self._run_resumable("audio", self.extract_audio):
                 return False
             
+            # Step 2b: Mark dead time (not fatal; the full audio is analyzed on failure)
+            if self.skip_dead_time:
+                self._run_resumable("dead_time", self.detect_dead_segments)
+            
             # Step 3: Analyze audio
-            if not self.analyze_audio():
+            if not self._run_resumable("analysis", self.analyze_audio):
                 return False
             
             # Step 4: Extract highlight clips
             clip_paths = self.extract_highlights()
+            complete = not self.failed_clips
             
             # Step 5: Compile highlights if requested
             if compile_clips and clip_paths:
-                self.compile_highlights(clip_paths)
+                complete = self.compile_highlights(clip_paths) is not None and complete
             
         except Exception as e:
-            print(f"Error during highlight extraction: {e}")
+            self._log(f"Error during highlight extraction: {e}")
             success = False
         
         finally:
-            # Clean up temporary files
-            self.cleanup()
+            # Clean up temporary files (kept for a resume if anything is missing)
+            self.cleanup(keep_work_dir=bool(self.work_dir) and not complete)
             
         return success
 
 
+def _is_within(path, directory):
+    """True if path is directory itself or lies inside it."""
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+
 def main():
     """Parse command line arguments and run the highlight extractor."""
     parser = argparse.ArgumentParser(description="Extract highlights from basketball games based on audio peaks.")
@@ -414,8 +1047,30 @@ def main():
     parser.add_argument("--post_buffer", type=int, default=5, help="Seconds to include after the peak")
     parser.add_argument("--output", default="highlights", help="Output directory for highlights")
     parser.add_argument("--compile", action="store_true", default=True, help="Compile clips into a single video")
+    parser.add_argument("--skip_dead_time", action="store_true",
+                        help="Skip ad breaks, halftime and other silent/black segments before analysis")
+    parser.add_argument("--search_mode", choices=["exhaustive", "coarse"], default="exhaustive",
+                        help="Analyze every window, or only regions nominated by a coarse loudness pass")
+    parser.add_argument("--threshold_mode", choices=["exact", "adaptive"], default="exact",
+                        help="Fixed whole-game thresholds, or thresholds adapting to the local crowd level")
+    parser.add_argument("--audio_profile", choices=sorted(AUDIO_PROFILES), default="full",
+                        help="Audio decoding/feature profile: full (22050 Hz, FFT) or fast (11025 Hz, IIR band-pass)")
+    parser.add_argument("--encode_profile", choices=list(ENCODE_PROFILES), default="default",
+                        help="Clip encode profile: preview (fast, larger), default, or archival (slow, best quality)")
+    parser.add_argument("--ladder", action="store_true",
+                        help="Also produce 720p and 480p renditions of each clip in the same ffmpeg pass")
+    parser.add_argument("--download_mode", choices=["full", "sections"], default="full",
+                        help="Download the whole video, or only audio for analysis plus the highlight sections")
+    parser.add_argument("--store", help="SQLite highlight store to record clips in (existing clips are reused)")
+    parser.add_argument("--game_id", help="Game identifier in the highlight store (default: the URL)")
+    parser.add_argument("--round", dest="game_round", help="Round label stored with the game")
+    parser.add_argument("--work_dir",
+                        help="Keep intermediate files and stage checkpoints here; rerun with the same directory to resume "
+                             "(only the pipeline's own files are removed once a run completes)")
     
     args = parser.parse_args()
+    if args.work_dir and _is_within(args.output, args.work_dir):
+        parser.error("--output must not be inside --work_dir")
     
     # Create and run the highlight extractor
     extractor = HighlightExtractor(
@@ -423,7 +1078,18 @@ def main():
         num_highlights=args.num_highlights,
         pre_buffer=args.pre_buffer,
         post_buffer=args.post_buffer,
-        output_dir=args.output
+        output_dir=args.output,
+        skip_dead_time=args.skip_dead_time,
+        search_mode=args.search_mode,
+        threshold_mode=args.threshold_mode,
+        audio_profile=args.audio_profile,
+        download_mode=args.download_mode,
+        encode_profile=args.encode_profile,
+        ladder=args.ladder,
+        store_path=args.store,
+        game_id=args.game_id,
+        game_round=args.game_round,
+        work_dir=args.work_dir
     )
     
     success = extractor.run(compile_clips=args.compile)
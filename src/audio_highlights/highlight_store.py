@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Persistent highlight store for the Basketball Highlights Extractor.
+
+Records every extracted highlight (game, video timestamps, intensity, whistle
+score, matched play-by-play event, clip path and the encode settings it was cut
+with) in a local SQLite database,
+so highlights can be queried across games without rescanning output folders:
+
+    store = HighlightStore("highlights.db")
+    store.top_highlights(limit=20, game_round="Round 5")
+    store.highlights_by_player("Максим Наумов")
+
+The extractor also uses it to skip cutting clips that already exist.
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+# Clip times are stored rounded to this many decimals so reruns match them exactly
+TIME_DECIMALS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    url TEXT,
+    game_round TEXT
+);
+
+CREATE TABLE IF NOT EXISTS highlights (
+    id INTEGER PRIMARY KEY,
+    game_id TEXT NOT NULL REFERENCES games(game_id),
+    rank INTEGER,
+    peak_time REAL NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    intensity REAL,
+    whistle_score REAL,
+    event_quarter TEXT,
+    event_time TEXT,
+    event_team TEXT,
+    event_player TEXT,
+    event_text TEXT,
+    clip_path TEXT,
+    encode_settings TEXT,
+    created_at TEXT NOT NULL,
+    UNIQUE (game_id, start_time, end_time)
+);
+
+CREATE INDEX IF NOT EXISTS idx_highlights_intensity ON highlights (intensity DESC);
+CREATE INDEX IF NOT EXISTS idx_highlights_player ON highlights (event_player);
+CREATE INDEX IF NOT EXISTS idx_games_round ON games (game_round);
+"""
+
+
+class HighlightStore:
+    """SQLite-backed store of highlights across games."""
+
+    def __init__(self, db_path="highlights.db"):
+        """
+        Open (and create if needed) the highlight database.
+
+        Args:
+            db_path (str): Path of the SQLite database file
+        """
+        self.db_path = db_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        # Several extractors may write to the same database; wait for locks instead of failing
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add columns introduced after a database was created."""
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(highlights)")}
+        if "encode_settings" not in columns:
+            # Clips recorded before have unknown settings and are never reused
+            with self.conn:
+                self.conn.execute("ALTER TABLE highlights ADD COLUMN encode_settings TEXT")
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_game(self, game_id, url=None, game_round=None):
+        """Register a game, updating its URL and round if they are given."""
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO games (game_id, url, game_round) VALUES (?, ?, ?)
+                ON CONFLICT (game_id) DO UPDATE SET
+                    url = COALESCE(excluded.url, url),
+                    game_round = COALESCE(excluded.game_round, game_round)
+                """,
+                (game_id, url, game_round)
+            )
+
+    def add_highlight(self, game_id, peak_time, start_time, end_time, intensity=None,
+                      whistle_score=None, clip_path=None, rank=None, event=None, encode_settings=None):
+        """
+        Record a highlight, replacing an earlier record of the same clip.
+
+        Args:
+            event (dict): Matched play-by-play event, as produced by PlayByPlayScraper
+                (quarter, time, team, player_name, event_text), or None
+            encode_settings (str): Encode profile and renditions the clip was cut with,
+                as an opaque string compared by find_clip
+
+        Returns:
+            int: Row ID of the highlight
+        """
+        event = event or {}
+        start_time = round(float(start_time), TIME_DECIMALS)
+        end_time = round(float(end_time), TIME_DECIMALS)
+
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO games (game_id) VALUES (?)", (game_id,))
+            self.conn.execute(
+                """
+                INSERT INTO highlights (
+                    game_id, rank, peak_time, start_time, end_time, intensity, whistle_score,
+                    event_quarter, event_time, event_team, event_player, event_text,
+                    clip_path, encode_settings, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (game_id, start_time, end_time) DO UPDATE SET
+                    rank = excluded.rank,
+                    peak_time = excluded.peak_time,
+                    intensity = excluded.intensity,
+                    whistle_score = excluded.whistle_score,
+                    event_quarter = COALESCE(excluded.event_quarter, event_quarter),
+                    event_time = COALESCE(excluded.event_time, event_time),
+                    event_team = COALESCE(excluded.event_team, event_team),
+                    event_player = COALESCE(excluded.event_player, event_player),
+                    event_text = COALESCE(excluded.event_text, event_text),
+                    clip_path = excluded.clip_path,
+                    encode_settings = excluded.encode_settings
+                """,
+                (
+                    game_id, rank, float(peak_time), start_time, end_time,
+                    _optional_float(intensity), _optional_float(whistle_score),
+                    event.get("quarter"), event.get("time"), event.get("team"),
+                    event.get("player_name"), event.get("event_text"),
+                    clip_path, encode_settings, datetime.now().isoformat(timespec="seconds")
+                )
+            )
+            row = self.conn.execute(
+                "SELECT id FROM highlights WHERE game_id = ? AND start_time = ? AND end_time = ?",
+                (game_id, start_time, end_time)
+            ).fetchone()
+        return row["id"]
+
+    def match_event(self, highlight_id, event):
+        """Attach a play-by-play event to a stored highlight."""
+        with self.conn:
+            self.conn.execute(
+                """
+                UPDATE highlights SET event_quarter = ?, event_time = ?, event_team = ?,
+                    event_player = ?, event_text = ?
+                WHERE id = ?
+                """,
+                (event.get("quarter"), event.get("time"), event.get("team"),
+                 event.get("player_name"), event.get("event_text"), highlight_id)
+            )
+
+    def find_clip(self, game_id, start_time, end_time, encode_settings=None):
+        """
+        Path of an already cut clip for this time range and these encode settings, or None.
+
+        Only clips that still exist on disk are returned.
+        """
+        row = self.conn.execute(
+            """
+            SELECT clip_path FROM highlights
+            WHERE game_id = ? AND start_time = ? AND end_time = ? AND encode_settings IS ?
+            """,
+            (game_id, round(float(start_time), TIME_DECIMALS), round(float(end_time), TIME_DECIMALS),
+             encode_settings)
+        ).fetchone()
+
+        if row and row["clip_path"] and os.path.exists(row["clip_path"]):
+            return row["clip_path"]
+        return None
+
+    def top_highlights(self, limit=20, game_round=None, game_ids=None):
+        """
+        Loudest highlights across games, optionally restricted to a round or a set of games.
+
+        Returns:
+            list: Highlight dicts, highest intensity first
+        """
+        query = """
+            SELECT highlights.*, games.url, games.game_round FROM highlights
+            JOIN games USING (game_id)
+        """
+        conditions, params = [], []
+        if game_round is not None:
+            conditions.append("games.game_round = ?")
+            params.append(game_round)
+        if game_ids is not None:
+            game_ids = list(game_ids)
+            conditions.append(f"highlights.game_id IN ({', '.join('?' * len(game_ids))})")
+            params.extend(game_ids)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY highlights.intensity DESC LIMIT ?"
+        params.append(limit)
+
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def highlights_by_player(self, player_name):
+        """
+        All highlights matched to a player's play-by-play events.
+
+        Returns:
+            list: Highlight dicts, ordered by game and video time
+        """
+        rows = self.conn.execute(
+            """
+            SELECT highlights.*, games.url, games.game_round FROM highlights
+            JOIN games USING (game_id)
+            WHERE highlights.event_player = ?
+            ORDER BY highlights.game_id, highlights.start_time
+            """,
+            (player_name,)
+        )
+        return [dict(row) for row in rows]
+
+    def game_highlights(self, game_id):
+        """All highlights of one game, in video order."""
+        rows = self.conn.execute(
+            "SELECT * FROM highlights WHERE game_id = ? ORDER BY start_time", (game_id,)
+        )
+        return [dict(row) for row in rows]
+
+
+def _optional_float(value):
+    return None if value is None else float(value)
+
+
+def main():
+    """Query the highlight store from the command line."""
+    parser = argparse.ArgumentParser(description="Query the highlight store.")
+    parser.add_argument("--db", default="highlights.db", help="Path of the highlight database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    top_parser = subparsers.add_parser("top", help="Loudest highlights across games")
+    top_parser.add_argument("--limit", type=int, default=20, help="Number of highlights")
+    top_parser.add_argument("--round", dest="game_round", help="Only games of this round")
+
+    player_parser = subparsers.add_parser("player", help="All highlights of a player")
+    player_parser.add_argument("name", help="Player name as it appears in the play-by-play")
+
+    args = parser.parse_args()
+
+    with HighlightStore(args.db) as store:
+        if args.command == "top":
+            highlights = store.top_highlights(limit=args.limit, game_round=args.game_round)
+        else:
+            highlights = store.highlights_by_player(args.name)
+
+    for highlight in highlights:
+        player = f"  {highlight['event_player']}" if highlight['event_player'] else ""
+        intensity = "     ? dB" if highlight['intensity'] is None else f"{highlight['intensity']:6.1f} dB"
+        print(f"{highlight['game_id']}  {highlight['start_time']:8.2f}-{highlight['end_time']:<8.2f}"
+              f"  {intensity}{player}  {highlight['clip_path']}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# Box Score Scraper for basketball.bg games
+
+import re
+from typing import Dict, List, Optional
+
+from fetcher import GAME_PAGE_URL, GameFetcher
+
+
+# Span ID suffix (aj_<team>_<player>_<suffix>) -> output field name
+PLAYER_FIELDS = {
+    "shirtNumber": "number",
+    "name": "name",
+    "captainString": "captain",
+    "playingPosition": "position",
+    "sMinutes": "minutes",
+    "sPoints": "points",
+    "sFieldGoalsMade": "fg_made",
+    "sFieldGoalsAttempted": "fg_attempted",
+    "sFieldGoalsPercentage": "fg_percentage",
+    "sTwoPointersMade": "two_made",
+    "sTwoPointersAttempted": "two_attempted",
+    "sTwoPointersPercentage": "two_percentage",
+    "sThreePointersMade": "three_made",
+    "sThreePointersAttempted": "three_attempted",
+    "sThreePointersPercentage": "three_percentage",
+    "sFreeThrowsMade": "ft_made",
+    "sFreeThrowsAttempted": "ft_attempted",
+    "sFreeThrowsPercentage": "ft_percentage",
+    "sReboundsOffensive": "rebounds_offensive",
+    "sReboundsDefensive": "rebounds_defensive",
+    "sReboundsTotal": "rebounds_total",
+    "sAssists": "assists",
+    "sTurnovers": "turnovers",
+    "sSteals": "steals",
+    "sBlocks": "blocks",
+    "sBlocksReceived": "blocks_received",
+    "sFoulsPersonal": "fouls_personal",
+    "sFoulsOn": "fouls_on",
+    "sPlusMinusPoints": "plus_minus",
+}
+
+# Fields kept as text; everything else is converted to int
+TEXT_FIELDS = {"name", "captain", "position", "minutes"}
+
+PLAYER_SPAN_ID = re.compile(r"aj_(\d+)_(\d+)_(\w+)")
+
+
+def parse_stat(value: str) -> Optional[int]:
+    """
+    Convert a statistic cell to int, or None if it is empty or not a number.
+    """
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+class BoxScoreScraper:
+    """
+    Scraper for box score data from basketball.bg game pages.
+
+    Pass the same GameFetcher as the ShotChartScraper to fetch and parse the
+    game page only once.
+    """
+
+    def __init__(self, game_id: str, fetcher: Optional[GameFetcher] = None, url: Optional[str] = None):
+        self.game_id = game_id
+        self.base_url = url or GAME_PAGE_URL.format(game_id=game_id)
+        self.fetcher = fetcher or GameFetcher()
+        self.box_score = {}
+
+    def parse_player_row(self, row) -> Optional[Dict]:
+        """
+        Parse one player row of a team's box score table.
+        """
+        classes = row.get("class", [])
+        if "row-not-used" in classes:
+            return None
+
+        player = {"starter": "p_starter" in classes}
+        for span in row.find_all("span", id=PLAYER_SPAN_ID):
+            suffix = PLAYER_SPAN_ID.fullmatch(span["id"]).group(3)
+
+            if suffix.startswith("eff_"):
+                field = "efficiency"
+            elif suffix in PLAYER_FIELDS:
+                field = PLAYER_FIELDS[suffix]
+            else:
+                continue
+
+            text = span.text.strip()
+            player[field] = text if field in TEXT_FIELDS else parse_stat(text)
+
+        if not player.get("name"):
+            return None
+
+        player["captain"] = bool(player.get("captain"))
+        return player
+
+    def parse_team(self, soup, team_index: int) -> Dict:
+        """
+        Parse a team's name and player rows (team_index 0 for the first team, 1 for the second).
+        """
+        name_span = soup.find("span", id=f"aj_{team_index + 1}_name")
+        container = soup.select_one(f"div.boxscorewrap.team-{team_index}-bs")
+
+        if not container:
+            print(f"Warning: Box score for team {team_index} not found")
+
+        players = []
+        rows = container.find_all("tr", class_=re.compile(r"^player-row")) if container else []
+        for row in rows:
+            player = self.parse_player_row(row)
+            if player:
+                players.append(player)
+
+        return {
+            "name": name_span.text.strip() if name_span else None,
+            "players": players,
+        }
+
+    def scrape(self) -> Dict:
+        """
+        Scrape the box score of both teams.
+        """
+        soup = self.fetcher.fetch_soup(self.base_url)
+
+        if not soup.select("div.boxscorewrap"):
+            raise ValueError("No box score found on the page. The page structure may have changed.")
+
+        self.box_score = {
+            "home": self.parse_team(soup, 0),
+            "away": self.parse_team(soup, 1),
+        }
+        return self.box_score
+
+    def players(self) -> List[Dict]:
+        """
+        All players of both teams, each with a "team" key ("home" or "away").
+        """
+        return [
+            {"team": team, **player}
+            for team, data in self.box_score.items()
+            for player in data["players"]
+        ]
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# Compact in-memory store for play-by-play events
+
+import html
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+
+# Missing player, score or point values are stored as -1
+MISSING = -1
+
+TEAMS = ("home", "away")
+
+# Per-event columns of the store, one typed array each
+COLUMNS = ("game", "period", "clock", "team", "player", "action", "player_points", "home_score", "away_score")
+
+_PLAYER_LINK_RE = re.compile(r"<a\b[^>]*class=\"player_name\"[^>]*>.*?</a>", re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+_PLAYER_POINTS_RE = re.compile(r"\s*\((\d+)\s+[^()\d]+\)$")
+
+
+def parse_action(event_text: str):
+    """
+    Reduce an event's HTML to its action text and the player's running point total.
+
+    "<a class="player_name">Name</a>2 стрелба тип флоутър успешен (5 точки)"
+    becomes ("2 стрелба тип флоутър успешен", 5). The point total is split off so
+    the same kind of action always maps to the same action code.
+
+    Returns:
+        tuple: (action, player_points); player_points is None if the text has none
+    """
+    text = _PLAYER_LINK_RE.sub(" ", event_text)
+    text = " ".join(html.unescape(_TAG_RE.sub(" ", text)).split())
+
+    match = _PLAYER_POINTS_RE.search(text)
+    if not match:
+        return text, None
+    return text[:match.start()], int(match.group(1))
+
+
+def parse_clock(time_str: str) -> int:
+    """
+    Convert a "MM:SS" game clock to seconds.
+    """
+    minutes, seconds = time_str.split(":")
+    return int(minutes) * 60 + int(seconds)
+
+
+def format_clock(seconds: int) -> str:
+    """
+    Convert seconds back to the "MM:SS" game clock format.
+    """
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class Vocabulary:
+    """
+    Dictionary encoding for repeated strings: each distinct value is stored once
+    and events refer to it by integer code.
+    """
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        """
+        Code of a value, adding it to the vocabulary if it is new.
+        """
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        """
+        Code of a value, or None if the value was never stored.
+        """
+        return self.codes.get(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.values) + sys.getsizeof(self.codes) + sum(
+            sys.getsizeof(value) for value in self.values
+        )
+
+
+class EventStore:
+    """
+    Struct-of-arrays store for the play-by-play events of many games.
+
+    Each event field is one typed array (machine integers, not Python objects).
+    Games, periods, players and actions are dictionary-encoded, the clock is
+    kept in seconds and the event HTML is reduced to its action code, so an
+    event costs a few dozen bytes instead of a dict of Python strings.
+
+    Events are appended one game at a time, which keeps each game a contiguous
+    row range. Players and actions are sparse, so each code also keeps the
+    sorted rows it occurs in; filters start from the shortest of these lists
+    (or the game's range) and only check the remaining columns on those rows.
+    """
+
+    def __init__(self):
+        self.games = Vocabulary()
+        self.periods = Vocabulary()
+        self.players = Vocabulary()
+        self.actions = Vocabulary()
+
+        self.game = array("I")
+        self.period = array("B")
+        self.clock = array("H")
+        self.team = array("B")
+        self.player = array("i")
+        self.action = array("H")
+        self.player_points = array("h")
+        self.home_score = array("h")
+        self.away_score = array("h")
+
+        # game code -> (first row, last row + 1)
+        self.game_rows: Dict[int, tuple] = {}
+        # player/action code -> sorted rows
+        self.player_rows: Dict[int, array] = {}
+        self.action_rows: Dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.game)
+
+    def add_game(self, game_id: str, events: Iterable[Dict]) -> int:
+        """
+        Append the events of one game, as produced by PlayByPlayScraper.
+
+        The game is staged in separate arrays and only appended once every event
+        has been decoded, so a malformed event raises without changing the store.
+
+        Returns:
+            int: Number of events added
+        """
+        game_id = str(game_id)
+        if self.games.lookup(game_id) in self.game_rows:
+            raise ValueError(f"Game {game_id} is already in the store")
+
+        decoded = [_decode_event(event) for event in events]
+
+        # Values that may not fit their column (e.g. a clock past 65535 s) fail here,
+        # before any string is added to a vocabulary
+        staged = {name: array(getattr(self, name).typecode) for name in COLUMNS}
+        for _, clock, team, _, _, player_points, home_score, away_score in decoded:
+            staged["clock"].append(clock)
+            staged["team"].append(team)
+            staged["player_points"].append(player_points)
+            staged["home_score"].append(home_score)
+            staged["away_score"].append(away_score)
+
+        player_rows: Dict[int, List[int]] = {}
+        action_rows: Dict[int, List[int]] = {}
+        start = len(self)
+        for row, (period, _, _, player_name, action, *_) in enumerate(decoded, start):
+            player_code = self.players.encode(player_name) if player_name else MISSING
+            if player_code != MISSING:
+                player_rows.setdefault(player_code, []).append(row)
+            action_code = self.actions.encode(action)
+            action_rows.setdefault(action_code, []).append(row)
+
+            staged["period"].append(self.periods.encode(period))
+            staged["player"].append(player_code)
+            staged["action"].append(action_code)
+
+        game_code = self.games.encode(game_id)
+        staged["game"].extend([game_code] * len(decoded))
+
+        for name in COLUMNS:
+            getattr(self, name).extend(staged[name])
+        for index, rows in ((self.player_rows, player_rows), (self.action_rows, action_rows)):
+            for code, code_rows in rows.items():
+                index.setdefault(code, array("I")).extend(code_rows)
+
+        self.game_rows[game_code] = (start, len(self))
+        return len(decoded)
+
+    def filter(self, game: Optional[str] = None, player: Optional[str] = None,
+               period: Optional[str] = None, action: Optional[str] = None,
+               team: Optional[str] = None) -> List[int]:
+        """
+        Row indices of the events matching all of the given values.
+
+        Values are decoded strings (e.g. period="Q4"); they are converted to
+        codes once, so the scan only compares integers.
+        """
+        start, end = 0, len(self)
+        if game is not None:
+            game_code = self.games.lookup(str(game))
+            if game_code is None:
+                return []
+            start, end = self.game_rows[game_code]
+
+        # (rows the code occurs in, column, code) for the values with posting lists
+        postings = []
+        for index, column, vocabulary, value in (
+            (self.player_rows, self.player, self.players, player),
+            (self.action_rows, self.action, self.actions, action),
+        ):
+            if value is not None:
+                code = vocabulary.lookup(value)
+                if code is None:
+                    return []
+                postings.append((index[code], column, code))
+
+        conditions = []
+        if period is not None:
+            code = self.periods.lookup(period)
+            if code is None:
+                return []
+            conditions.append((self.period, code))
+        if team is not None:
+            conditions.append((self.team, TEAMS.index(team)))
+
+        if postings:
+            # Start from the shortest posting list; the others are checked through their columns
+            postings.sort(key=lambda posting: len(posting[0]))
+            shortest = postings[0][0]
+            rows = shortest[bisect_left(shortest, start):bisect_left(shortest, end)]
+            conditions.extend((column, code) for _, column, code in postings[1:])
+        else:
+            rows = range(start, end)
+
+        for column, code in conditions:
+            rows = [i for i in rows if column[i] == code]
+        return list(rows)
+
+    def event(self, row: int) -> Dict:
+        """
+        Decode one event back to a dict (the HTML is replaced by the action text).
+        """
+        player = self.player[row]
+        return {
+            "game_id": self.games.values[self.game[row]],
+            "quarter": self.periods.values[self.period[row]],
+            "time": format_clock(self.clock[row]),
+            "team": TEAMS[self.team[row]],
+            "player_name": None if player == MISSING else self.players.values[player],
+            "action": self.actions.values[self.action[row]],
+            "player_points": _optional(self.player_points[row]),
+            "home_score": _optional(self.home_score[row]),
+            "away_score": _optional(self.away_score[row]),
+        }
+
+    def events(self, rows: Optional[Iterable[int]] = None) -> List[Dict]:
+        """
+        Decode the given rows (default: all rows) to dicts.
+        """
+        return [self.event(row) for row in (range(len(self)) if rows is None else rows)]
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory footprint of the store in bytes.
+        """
+        columns = (self.game, self.period, self.clock, self.team, self.player, self.action,
+                   self.player_points, self.home_score, self.away_score)
+        return (
+            sum(sys.getsizeof(column) for column in columns)
+            + sum(vocabulary.nbytes() for vocabulary in (self.games, self.periods, self.players, self.actions))
+            + sys.getsizeof(self.game_rows)
+            + sum(sys.getsizeof(rows) for index in (self.player_rows, self.action_rows) for rows in index.values())
+        )
+
+
+def _decode_event(event: Dict) -> tuple:
+    """
+    Decode and validate one event dict into the values stored per row.
+
+    Raises:
+        ValueError: If the team or the clock is malformed
+        KeyError: If a required field is missing
+    """
+    action, player_points = parse_action(event["event_text"])
+    team = event["team"]
+    if team not in TEAMS:
+        raise ValueError(f"Unknown team {team!r}")
+    return (
+        event["quarter"],
+        parse_clock(event["time"]),
+        TEAMS.index(team),
+        event.get("player_name"),
+        action,
+        MISSING if player_points is None else player_points,
+        MISSING if event.get("home_score") is None else event["home_score"],
+        MISSING if event.get("away_score") is None else event["away_score"],
+    )
+
+
+def _optional(value: int) -> Optional[int]:
+    return None if value == MISSING else value
+
+
+def dict_events_nbytes(events: List[Dict]) -> int:
+    """
+    Approximate memory footprint of a list of event dicts in bytes.
+
+    Objects shared between events (e.g. interned keys, small ints, None) are
+    counted once.
+    """
+    seen = set()
+    total = sys.getsizeof(events)
+    for event in events:
+        for obj in (event, *event.keys(), *event.values()):
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                total += sys.getsizeof(obj)
+    return total
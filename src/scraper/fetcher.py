@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# Shared HTTP fetcher for basketball.bg game pages
+
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import requests
+from bs4 import BeautifulSoup
+
+
+# Game page holding both the box score and the shot chart. Only the
+# play-by-play endpoint is documented; override the URL if this one changes.
+GAME_PAGE_URL = "https://comps.basketball.bg/game.php?g_id={game_id}"
+
+# Parsed pages kept by a fetcher; a game has two, so this covers a few games in flight
+MAX_CACHED_PAGES = 8
+
+class GameFetcher:
+    """
+    Pooled fetcher for basketball.bg pages.
+
+    All requests go through one requests.Session, so connections are reused
+    across the pages of a game (and across games). Each URL is fetched and
+    parsed once while it is cached; scrapers sharing a fetcher share the
+    parsed document. Raw HTML is never cached, and only the max_cached_pages
+    most recently used documents are kept, so a fetcher shared across a
+    season does not hold every page in memory.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, max_retries: int = 3,
+                 retry_delay: float = 2, timeout: float = 10, parser: str = "html.parser",
+                 max_cached_pages: int = MAX_CACHED_PAGES):
+        if max_cached_pages < 1:
+            raise ValueError(f"max_cached_pages must be at least 1, got {max_cached_pages}")
+
+        self.session = session or requests.Session()
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.parser = parser
+        self.max_cached_pages = max_cached_pages
+
+        # Parsed pages, least recently used first
+        self._soups: "OrderedDict[str, BeautifulSoup]" = OrderedDict()
+
+        # Counters to verify how much work a scrape did
+        self.request_count = 0
+        self.parse_count = 0
+
+    def fetch_html(self, url: str, max_retries: Optional[int] = None) -> str:
+        """
+        Fetch HTML from URL with retries on failure. Responses are not cached;
+        use fetch_soup to share a page between scrapers.
+        """
+        max_retries = max_retries or self.max_retries
+        for attempt in range(max_retries):
+            try:
+                self.request_count += 1
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                return response.text
+            except requests.exceptions.RequestException as e:
+                if attempt == max_retries - 1:
+                    raise
+                print(f"Request failed: {e}. Retrying in {self.retry_delay} seconds...")
+                time.sleep(self.retry_delay)
+
+        # This should never happen due to the exception in the loop
+        raise RuntimeError("Failed to fetch HTML after maximum retries")
+
+    def fetch_soup(self, url: str) -> BeautifulSoup:
+        """
+        Fetch and parse a page, reusing the parsed document if it is still cached.
+        """
+        if url in self._soups:
+            self._soups.move_to_end(url)
+            return self._soups[url]
+
+        soup = BeautifulSoup(self.fetch_html(url), self.parser)
+        self.parse_count += 1
+        self._soups[url] = soup
+
+        while len(self._soups) > self.max_cached_pages:
+            self._soups.popitem(last=False)
+        return soup
+
+    def discard(self, *urls: str) -> None:
+        """
+        Drop the cached copies of some pages, e.g. those of a finished game.
+        """
+        for url in urls:
+            self._soups.pop(url, None)
+
+    def clear(self) -> None:
+        """
+        Drop all cached pages.
+        """
+        self._soups.clear()
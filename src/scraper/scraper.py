@@ -4,11 +4,11 @@
 import argparse
 import json
 import re
-import time
 from typing import Dict, List, Optional, Tuple, Union
 
-import requests
-from bs4 import BeautifulSoup
+from box_score import BoxScoreScraper
+from fetcher import GameFetcher
+from shot_chart import ShotChartScraper
 
 
 class PlayByPlayScraper:
@@ -16,28 +16,17 @@ class PlayByPlayScraper:
     Scraper for play-by-play data from basketball.bg game pages.
     """
 
-    def __init__(self, game_id: str):
+    def __init__(self, game_id: str, fetcher: Optional[GameFetcher] = None):
         self.game_id = game_id
         self.base_url = f"https://comps.basketball.bg/game_play.inc.php?g_id={game_id}"
+        self.fetcher = fetcher or GameFetcher()
         self.events = []
 
     def fetch_html(self, url: str, max_retries: int = 3) -> str:
         """
         Fetch HTML from URL with retries on failure.
         """
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                return response.text
-            except requests.exceptions.RequestException as e:
-                if attempt == max_retries - 1:
-                    raise
-                print(f"Request failed: {e}. Retrying in 2 seconds...")
-                time.sleep(2)
-        
-        # This should never happen due to the exception in the loop
-        raise RuntimeError("Failed to fetch HTML after maximum retries")
+        return self.fetcher.fetch_html(url, max_retries)
 
     def parse_score(self, score_div) -> Tuple[int, int]:
         """
@@ -151,9 +140,8 @@ class PlayByPlayScraper:
         """
         Scrape play-by-play data for all quarters.
         """
-        # Fetch the main page HTML
-        html = self.fetch_html(self.base_url)
-        soup = BeautifulSoup(html, "html.parser")
+        # Fetch and parse the main page (shared with other scrapers using the same fetcher)
+        soup = self.fetcher.fetch_soup(self.base_url)
         
         # Find all quarter tables (regular quarters + overtimes)
         quarter_tables = soup.select("table.tbl_play[id^='q_']")
@@ -205,14 +193,71 @@ class PlayByPlayScraper:
         return filename
 
 
+class GameScraper:
+    """
+    Scrapes play-by-play, box score and shot chart data for one game.
+
+    All three scrapers share one GameFetcher: the play-by-play page and the
+    game page are each downloaded and parsed once, over a pooled connection.
+    scrape() drops the game's pages from the fetcher when it is done, so a
+    fetcher shared across games only keeps the session.
+    """
+
+    def __init__(self, game_id: str, fetcher: Optional[GameFetcher] = None, game_url: Optional[str] = None):
+        self.game_id = game_id
+        self.fetcher = fetcher or GameFetcher()
+        self.play_by_play = PlayByPlayScraper(game_id, self.fetcher)
+        self.box_score = BoxScoreScraper(game_id, self.fetcher, game_url)
+        self.shot_chart = ShotChartScraper(game_id, self.fetcher, game_url)
+
+    def scrape(self) -> Dict:
+        """
+        Scrape all data for the game.
+        """
+        try:
+            return {
+                "game_id": self.game_id,
+                "play_by_play": self.play_by_play.scrape(),
+                "box_score": self.box_score.scrape(),
+                "shot_chart": {
+                    "shots": self.shot_chart.scrape(),
+                    "totals": self.shot_chart.totals,
+                },
+            }
+        finally:
+            self.fetcher.discard(self.play_by_play.base_url, self.box_score.base_url, self.shot_chart.base_url)
+
+    def save_json(self, data: Dict, filename: Optional[str] = None) -> str:
+        """
+        Save all game data to a JSON file.
+        """
+        if not filename:
+            filename = f"game_{self.game_id}.json"
+
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+        print(f"Saved game data ({len(data['play_by_play'])} events, "
+              f"{len(data['shot_chart']['shots'])} shots) to {filename}")
+        return filename
+
+
 def main():
     parser = argparse.ArgumentParser(description="Scrape play-by-play data from basketball.bg games")
     parser.add_argument("--game_id", required=True, help="Game ID to scrape")
     parser.add_argument("--output", choices=["json", "csv"], default="json", help="Output format (json or csv)")
     parser.add_argument("--output_file", help="Custom output filename")
+    parser.add_argument("--all", action="store_true",
+                        help="Also scrape the box score and shot chart (JSON output only)")
+    parser.add_argument("--game_url", help="Override the game page URL used for the box score and shot chart")
     
     args = parser.parse_args()
     
+    if args.all:
+        game_scraper = GameScraper(args.game_id, game_url=args.game_url)
+        game_scraper.save_json(game_scraper.scrape(), args.output_file)
+        return
+    
     scraper = PlayByPlayScraper(args.game_id)
     events = scraper.scrape()
     
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# Shot Chart Scraper for basketball.bg games
+
+import re
+from typing import Dict, List, Optional
+
+from fetcher import GAME_PAGE_URL, GameFetcher
+
+
+TEAM_CLASSES = {"sc_tn1": "home", "sc_tn2": "away"}
+
+# Hidden team total span ID suffix (aj_<team>_tot_<suffix>) -> output field name
+TOTAL_FIELDS = {
+    "sFieldGoalsMade": "fg_made",
+    "sFieldGoalsAttempted": "fg_attempted",
+    "sFieldGoalsPercentage": "fg_percentage",
+    "sTwoPointersMade": "two_made",
+    "sTwoPointersAttempted": "two_attempted",
+    "sTwoPointersPercentage": "two_percentage",
+    "sThreePointersMade": "three_made",
+    "sThreePointersAttempted": "three_attempted",
+    "sThreePointersPercentage": "three_percentage",
+    "sFreeThrowsMade": "ft_made",
+    "sFreeThrowsAttempted": "ft_attempted",
+    "sFreeThrowsPercentage": "ft_percentage",
+}
+
+PERIOD_CLASS = re.compile(r"sc_per(\d+|ot)")
+PLAYER_CLASS = re.compile(r"sc_pn(\d+)")
+STYLE_POSITION = re.compile(r"(bottom|left)\s*:\s*(-?[\d.]+)%")
+
+
+class ShotChartScraper:
+    """
+    Scraper for shot chart data from basketball.bg game pages.
+
+    Pass the same GameFetcher as the BoxScoreScraper to fetch and parse the
+    game page only once.
+    """
+
+    def __init__(self, game_id: str, fetcher: Optional[GameFetcher] = None, url: Optional[str] = None):
+        self.game_id = game_id
+        self.base_url = url or GAME_PAGE_URL.format(game_id=game_id)
+        self.fetcher = fetcher or GameFetcher()
+        self.shots = []
+        self.totals = {}
+
+    def parse_shot(self, span) -> Optional[Dict]:
+        """
+        Parse a single shot marker into a structured shot object.
+        """
+        classes = span.get("class", [])
+
+        made = None
+        period = None
+        player_index = None
+        team = None
+        for cls in classes:
+            if cls.endswith("_made"):
+                made = True
+            elif cls.endswith("_missed"):
+                made = False
+            elif PERIOD_CLASS.fullmatch(cls):
+                value = PERIOD_CLASS.fullmatch(cls).group(1)
+                period = "OT" if value == "ot" else f"Q{value}"
+            elif PLAYER_CLASS.fullmatch(cls):
+                player_index = int(PLAYER_CLASS.fullmatch(cls).group(1))
+            elif cls in TEAM_CLASSES:
+                team = TEAM_CLASSES[cls]
+
+        if made is None:
+            print(f"Warning: Shot marker without outcome class: {classes}")
+            return None
+
+        position = {key: float(value) for key, value in STYLE_POSITION.findall(span.get("style", ""))}
+
+        # Title format: "<number>, <name>, <shot type>"
+        parts = [part.strip() for part in span.get("title", "").split(",", 2)]
+        parts += [None] * (3 - len(parts))
+        number, player_name, shot_type = parts
+
+        return {
+            "period": period,
+            "team": team,
+            "player_index": player_index,
+            "player_number": int(number) if number and number.isdigit() else None,
+            "player_name": player_name or None,
+            "shot_type": shot_type,
+            "made": made,
+            "x": position.get("left"),
+            "y": position.get("bottom"),
+        }
+
+    def parse_totals(self, soup, team_number: int) -> Dict:
+        """
+        Parse the hidden shooting totals of a team (team_number 1 or 2).
+        """
+        totals = {}
+        for suffix, field in TOTAL_FIELDS.items():
+            span = soup.find("span", id=f"aj_{team_number}_tot_{suffix}")
+            text = span.text.strip() if span else ""
+            totals[field] = int(text) if text.isdigit() else None
+        return totals
+
+    def scrape(self) -> List[Dict]:
+        """
+        Scrape all shots and the team shooting totals.
+        """
+        soup = self.fetcher.fetch_soup(self.base_url)
+
+        container = soup.select_one("#shotchart_data")
+        if not container:
+            raise ValueError("No shot chart found on the page. The page structure may have changed.")
+
+        self.shots = []
+        for span in container.select("span.sc_img"):
+            shot = self.parse_shot(span)
+            if shot:
+                self.shots.append(shot)
+
+        self.totals = {
+            "home": self.parse_totals(soup, 1),
+            "away": self.parse_totals(soup, 2),
+        }
+        return self.shots
@@ -0,0 +1,12 @@
+"""
+Pytest configuration: make the modules under src/ importable the same way the
+scripts import each other (e.g. `from highlight_extractor import ...`).
+"""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+for package_dir in ("audio_highlights", "scraper"):
+    sys.path.insert(0, os.path.join(SRC_DIR, package_dir))
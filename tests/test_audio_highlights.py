@@ -0,0 +1,874 @@
+#!/usr/bin/env python3
+"""
+Tests for the audio-based highlight extraction helpers.
+
+These run on synthetic audio and captured ffmpeg output, so no video
+download or ffmpeg installation is required.
+"""
+
+import asyncio
+import functools
+import os
+import re
+import shutil
+import socket
+import sqlite3
+import subprocess
+import threading
+import wave
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import butter, resample_poly, sosfilt
+
+import audio_processing
+from audio_processing import (
+    AUDIO_PROFILES,
+    AdaptiveThresholds,
+    P2Quantile,
+    RollingBaseline,
+    coarse_envelope,
+    compute_window_features,
+    flat_loudness_segments,
+    load_wav_samples,
+    merge_segments,
+    nominate_candidate_regions,
+    parse_blackdetect,
+    parse_ebur128,
+    parse_silencedetect,
+    segments_mask,
+)
+from async_extractor import AsyncHighlightExtractor
+import highlight_store
+from highlight_extractor import LADDER_HEIGHTS, HighlightExtractor
+from highlight_store import HighlightStore
+
+
+FFMPEG_SCAN_OUTPUT = """\
+[silencedetect @ 0x7f32e4001b80] silence_start: 10.0078
+[silencedetect @ 0x7f32e4001b80] silence_end: 30.000181 | silence_duration: 19.992381
+[blackdetect @ 0x7f32f000f440] black_start:25 black_end:70 black_duration:45
+[blackdetect @ 0x7f32f000f440] black_start:400.5 black_end:420 black_duration:19.5
+[silencedetect @ 0x7f32e4001b80] silence_start: 3000
+"""
+
+
+def test_parse_dead_time_scan():
+    """Silence and black segments are parsed; an open silence is closed at the end."""
+    assert parse_silencedetect(FFMPEG_SCAN_OUTPUT, total_duration=3600) == [
+        (10.0078, 30.000181),
+        (3000.0, 3600.0),
+    ]
+    assert parse_silencedetect(FFMPEG_SCAN_OUTPUT) == [(10.0078, 30.000181)]
+    assert parse_blackdetect(FFMPEG_SCAN_OUTPUT) == [(25.0, 70.0), (400.5, 420.0)]
+
+
+def test_parse_ebur128_and_flat_loudness():
+    """Short-term loudness readings are parsed; only a long, flat stretch is marked dead."""
+    output = (
+        "[Parsed_ebur128_1 @ 0x55d0] t: 0.0999773  TARGET:-23 LUFS    M:-120.7 S:-120.7     I: -70.0 LUFS       LRA:   0.0 LU\n"
+        "[Parsed_ebur128_1 @ 0x55d0] t: 3.09998    TARGET:-23 LUFS    M: -21.8 S: -22.4     I: -21.8 LUFS       LRA:   0.0 LU\n"
+    )
+    times, loudness = parse_ebur128(output)
+    np.testing.assert_allclose(times, [0.0999773, 3.09998])
+    np.testing.assert_allclose(loudness, [-120.7, -22.4])
+
+    # Live game audio swinging by several LU, a 60 s ad at a constant -20 LUFS, then live again
+    rng = np.random.default_rng(0)
+    times = np.arange(0, 180, 0.1)
+    loudness = -28 + rng.uniform(-6, 6, len(times))
+    loudness[(times >= 60) & (times < 120)] = -20 + rng.uniform(-0.5, 0.5, 600)
+
+    segments = flat_loudness_segments(times, loudness)
+    assert len(segments) == 1
+    start, end = segments[0]
+    assert 55 <= start <= 62 and 118 <= end <= 125
+
+    # A silent stretch is left to silencedetect
+    assert flat_loudness_segments(times, np.full(len(times), -120.0)) == []
+
+
+def test_merge_segments():
+    """Overlapping and nearby segments are merged, empty ones dropped."""
+    segments = [(400, 420), (10, 30), (25, 70), (80, 90), (500, 500)]
+    assert merge_segments(segments) == [(10, 70), (80, 90), (400, 420)]
+    assert merge_segments(segments, max_gap=15) == [(10, 90), (400, 420)]
+
+
+def test_segments_mask():
+    """Windows overlapping a dead segment are masked."""
+    times = np.arange(0, 10, 1.0)
+    mask = segments_mask(times, [(2.0, 4.0)], window_duration=0.5)
+    assert mask.tolist() == [False, False, True, True] + [False] * 6
+
+
+def test_iir_whistle_feature_matches_fft_classification():
+    """Both whistle methods separate a 3 kHz whistle from crowd noise and agree on RMS."""
+    frame_rate = AUDIO_PROFILES["fast"]["sample_rate"]
+    rng = np.random.default_rng(1)
+    t = np.arange(frame_rate * 4) / frame_rate
+
+    samples = sosfilt(butter(1, 1000, fs=frame_rate, output='sos'), rng.normal(0, 0.05, len(t)))
+    samples[2 * frame_rate:3 * frame_rate] += 0.8 * np.sin(2 * np.pi * 3000 * t[:frame_rate])
+
+    frame_length = frame_rate // 2
+    frame_starts = np.array([0, frame_rate, 2 * frame_rate + 100])
+
+    for method in ("fft", "iir"):
+        profile = next(p for p in AUDIO_PROFILES.values() if p["whistle_method"] == method)
+        energy, whistle = compute_window_features(samples, frame_rate, frame_length, frame_starts, method)
+
+        expected_rms = [np.sqrt(np.mean(samples[i:i + frame_length]**2)) for i in frame_starts]
+        np.testing.assert_allclose(energy, expected_rms)
+        assert (whistle > profile["whistle_threshold"]).tolist() == [False, False, True]
+
+
+def test_iir_features_over_spans_match_whole_track(monkeypatch):
+    """Chunked filtering of only the analyzed spans gives the same features as the whole track."""
+    frame_rate = AUDIO_PROFILES["fast"]["sample_rate"]
+    rng = np.random.default_rng(2)
+    t = np.arange(frame_rate * 60) / frame_rate
+    samples = rng.normal(0, 0.05, len(t)) + 0.3 * np.sin(2 * np.pi * 3000 * t) * (t % 20 < 1)
+
+    frame_length, hop_length = int(frame_rate * 0.5), int(frame_rate * 0.1)
+    frame_starts = np.arange(0, len(samples) - frame_length, hop_length)
+    whole = compute_window_features(samples, frame_rate, frame_length, frame_starts, "iir")
+
+    # Small chunks, and windows from a few separate regions given out of order
+    monkeypatch.setattr(audio_processing, "FEATURE_CHUNK_SAMPLES", 10000)
+    subset = np.flatnonzero((frame_starts // frame_rate) % 15 < 3)[::-1]
+    energy, whistle = compute_window_features(samples, frame_rate, frame_length, frame_starts[subset], "iir")
+
+    np.testing.assert_allclose(energy, whole[0][subset], rtol=1e-6)
+    np.testing.assert_allclose(whistle, whole[1][subset], atol=1e-6)
+
+
+def write_synthetic_game(audio_path, duration=1200, frame_rate=11025, seed=0):
+    """
+    Write a synthetic game soundtrack: drifting crowd noise, crowd roars of varying
+    loudness and a few loud referee whistles (3 kHz tones).
+
+    Returns:
+        list: Start times of the crowd roars
+    """
+    rng = np.random.default_rng(seed)
+    n_samples = duration * frame_rate
+    t = np.arange(n_samples) / frame_rate
+
+    # Crowd noise with most energy below ~1 kHz, its level drifting slowly over the game
+    level = 0.05 * (1.5 + np.sin(2 * np.pi * t / 300))
+    samples = sosfilt(butter(1, 1000, fs=frame_rate, output='sos'), rng.normal(0, 1, n_samples)) * level
+
+    roar_times = np.arange(40, duration - 40, 75.0)
+    roar_times += rng.uniform(-5, 5, len(roar_times))
+    for roar_time, gain in zip(roar_times, rng.uniform(3, 10, len(roar_times))):
+        start, end = int(roar_time * frame_rate), int((roar_time + 3) * frame_rate)
+        samples[start:end] *= gain
+
+    for whistle_time in (100, 620, 1010):
+        start, end = int(whistle_time * frame_rate), int((whistle_time + 1) * frame_rate)
+        samples[start:end] += 0.5 * np.sin(2 * np.pi * 3000 * t[start:end])
+
+    write_wav(audio_path, samples, frame_rate)
+    return roar_times
+
+
+def write_wav(audio_path, samples, frame_rate):
+    """Write mono float samples as a 16-bit PCM WAV file."""
+    samples = np.clip(samples, -1, 1)
+    with wave.open(audio_path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(frame_rate)
+        wav_file.writeframes((samples * 32767).astype(np.int16).tobytes())
+
+
+def run_analysis(audio_path, output_dir, **kwargs):
+    """Run analyze_audio on an existing WAV file and return the selected highlights."""
+    extractor = HighlightExtractor("synthetic", output_dir=str(output_dir), **kwargs)
+    try:
+        extractor.audio_path = audio_path
+        assert extractor.analyze_audio()
+        return extractor.highlight_timestamps
+    finally:
+        extractor.cleanup()
+
+
+def test_coarse_envelope_and_candidates():
+    """A loud block stands out in the decimated envelope and is nominated with margin."""
+    frame_rate = 8000
+    samples = np.full(frame_rate * 20, 0.01)
+    samples[10 * frame_rate:11 * frame_rate] = 0.5
+
+    block_times, envelope_db = coarse_envelope(samples, frame_rate)
+    assert len(block_times) == 20
+    assert np.argmax(envelope_db) == 10
+
+    assert nominate_candidate_regions(block_times, envelope_db, percentile=99, margin=2.0) == [(8.0, 13.0)]
+
+
+def test_dead_segments_are_never_selected(tmp_path):
+    """A roar inside a dead segment (e.g. a halftime show) would win, but is skipped."""
+    audio_path = str(tmp_path / "game.wav")
+    write_synthetic_game(audio_path)
+    samples, frame_rate = load_wav_samples(audio_path)
+    samples = samples * 0.3
+    samples[500 * frame_rate:520 * frame_rate] = np.random.default_rng(1).normal(0, 0.5, 20 * frame_rate)
+    write_wav(audio_path, samples, frame_rate)
+
+    assert (np.abs(run_analysis(audio_path, tmp_path / "all", num_highlights=3)['time'] - 510) <= 10).any()
+
+    for search_mode in ("exhaustive", "coarse"):
+        extractor = HighlightExtractor("synthetic", output_dir=str(tmp_path / search_mode),
+                                       num_highlights=3, search_mode=search_mode)
+        try:
+            extractor.audio_path = audio_path
+            extractor.dead_segments = [(495.0, 525.0)]
+            assert extractor.analyze_audio()
+            times = extractor.highlight_timestamps['time']
+        finally:
+            extractor.cleanup()
+
+        assert len(times) == 3
+        assert not ((times >= 495 - 0.5) & (times <= 525)).any()
+
+
+def test_coarse_search_recalls_exhaustive_highlights(tmp_path):
+    """The coarse-to-fine search selects the same top-N highlights as the exhaustive pass."""
+    audio_path = str(tmp_path / "game.wav")
+    write_synthetic_game(audio_path)
+
+    exhaustive = run_analysis(audio_path, tmp_path / "exhaustive", num_highlights=10)
+    coarse = run_analysis(audio_path, tmp_path / "coarse", num_highlights=10, search_mode="coarse")
+
+    assert len(exhaustive) == 10
+    assert coarse['time'].tolist() == exhaustive['time'].tolist()
+    np.testing.assert_allclose(coarse['intensity'], exhaustive['intensity'])
+
+
+def test_fast_profile_selects_the_same_highlights(tmp_path):
+    """The fast profile at its lower sample rate finds the same highlights as the full profile."""
+    full_rate = AUDIO_PROFILES["full"]["sample_rate"]
+    fast_rate = AUDIO_PROFILES["fast"]["sample_rate"]
+    full_path = str(tmp_path / "full.wav")
+    fast_path = str(tmp_path / "fast.wav")
+
+    # Decode the same game at both rates (resampling stands in for ffmpeg)
+    write_synthetic_game(full_path, duration=900, frame_rate=full_rate)
+    samples, _ = load_wav_samples(full_path)
+    write_wav(fast_path, resample_poly(samples, fast_rate, full_rate), fast_rate)
+
+    full = run_analysis(full_path, tmp_path / "full", num_highlights=6)
+    fast = run_analysis(fast_path, tmp_path / "fast", num_highlights=6, audio_profile="fast")
+
+    # Hop lengths differ by a fraction of a sample between rates, so compare within half a second
+    assert len(fast) == len(full) == 6
+    for peak_time in fast['time']:
+        assert np.min(np.abs(full['time'] - peak_time)) <= 0.5
+
+
+def test_p2_quantile_tracks_exact_percentile():
+    """The streaming P-squared estimate lands within a fraction of a percent of the exact quantile."""
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(-40, 3, 10000), rng.normal(-25, 2, 2000)])
+    rng.shuffle(values)
+
+    for p in (0.5, 0.95):
+        sketch = P2Quantile(p)
+        for value in values:
+            sketch.update(value)
+        assert abs(np.mean(values <= sketch.value()) - p) < 0.005
+
+    # Exact while there are too few observations for the markers
+    sketch = P2Quantile(0.5)
+    for value in (3.0, 1.0, 2.0):
+        sketch.update(value)
+    assert sketch.value() == 2.0
+
+
+def test_rolling_baseline_follows_level_changes_but_not_peaks():
+    """A short peak stands out against the baseline; a lasting level change is absorbed."""
+    baseline = RollingBaseline(time_constant=30, step=0.1)
+    for _ in range(3000):
+        baseline.update(-40.0)
+
+    assert baseline.update(-25.0) == pytest.approx(15.0)
+    for _ in range(3000):
+        relative = baseline.update(-28.0)
+    assert abs(relative) < 0.01
+
+
+def test_adaptive_whistle_threshold_matches_profile_thresholds(tmp_path):
+    """On the reference game, the adaptive whistle thresholds land near each profile's fixed one."""
+    audio_path = str(tmp_path / "game.wav")
+    write_synthetic_game(audio_path, duration=900, frame_rate=AUDIO_PROFILES["full"]["sample_rate"])
+    samples, source_rate = load_wav_samples(audio_path)
+
+    for profile in AUDIO_PROFILES.values():
+        frame_rate = profile["sample_rate"]
+        if frame_rate != source_rate:
+            samples_at_rate = resample_poly(samples, frame_rate, source_rate)
+        else:
+            samples_at_rate = samples
+        frame_length, hop_length = int(frame_rate * 0.5), int(frame_rate * 0.1)
+        frame_starts = np.arange(0, len(samples_at_rate) - frame_length, hop_length)
+        energy, whistle = compute_window_features(samples_at_rate, frame_rate, frame_length,
+                                                  frame_starts, profile["whistle_method"])
+
+        thresholds = AdaptiveThresholds(hop_length / frame_rate, profile["whistle_headroom"])
+        relative_db = np.array([thresholds.update(20 * np.log10(e + 1e-10), w) for e, w in zip(energy, whistle)])
+
+        assert thresholds.whistle_threshold() == pytest.approx(profile["whistle_threshold"], abs=0.05)
+        assert abs(np.mean(relative_db <= thresholds.energy_threshold()) - 0.95) < 0.01
+
+
+@pytest.mark.parametrize("search_mode", ["exhaustive", "coarse"])
+def test_adaptive_thresholds_survive_crowd_level_change(tmp_path, search_mode):
+    """
+    With the crowd 4x louder in the second half, the fixed percentile mostly picks
+    second-half moments; adaptive thresholds still pick roars from both halves.
+    """
+    audio_path = str(tmp_path / "game.wav")
+    roar_times = write_synthetic_game(audio_path)
+    samples, frame_rate = load_wav_samples(audio_path)
+    samples = samples.copy()
+    samples[len(samples) // 2:] *= 4
+    write_wav(audio_path, samples, frame_rate)
+
+    exact = run_analysis(audio_path, tmp_path / "exact", num_highlights=6, search_mode=search_mode)
+    adaptive = run_analysis(audio_path, tmp_path / "adaptive", num_highlights=6, search_mode=search_mode,
+                            threshold_mode="adaptive")
+
+    assert len(adaptive) == 6
+    assert (adaptive['time'] < 600).sum() > (exact['time'] < 600).sum()
+    for peak_time in adaptive['time']:
+        assert np.min(np.abs(roar_times - peak_time)) <= 1.0
+
+
+def test_highlight_store_queries_across_games(tmp_path):
+    """Top-N and per-player queries run over highlights recorded for several games."""
+    with HighlightStore(str(tmp_path / "highlights.db")) as store:
+        store.add_game("game_1", url="https://example.com/1", game_round="Round 5")
+        store.add_game("game_2", game_round="Round 5")
+        store.add_game("game_3", game_round="Round 6")
+
+        store.add_highlight("game_1", 100.0, 95.0, 105.0, intensity=-10.0, clip_path="a.mp4",
+                            event={"quarter": "Q1", "time": "03:10", "player_name": "Иван Петров"})
+        store.add_highlight("game_2", 200.0, 195.0, 205.0, intensity=-5.0, clip_path="b.mp4")
+        store.add_highlight("game_3", 300.0, 295.0, 305.0, intensity=-1.0, clip_path="c.mp4")
+        highlight_id = store.add_highlight("game_2", 400.0, 395.0, 405.0, intensity=-20.0)
+        store.match_event(highlight_id, {"quarter": "Q4", "time": "09:55", "player_name": "Иван Петров"})
+
+        # Re-recording the same clip updates it instead of adding a duplicate
+        assert store.add_highlight("game_1", 100.0, 95.0, 105.0, intensity=-9.0, clip_path="a.mp4") == 1
+        assert store.game_highlights("game_1")[0]["event_player"] == "Иван Петров"
+
+        top = store.top_highlights(limit=2, game_round="Round 5")
+        assert [(h["game_id"], h["intensity"]) for h in top] == [("game_2", -5.0), ("game_1", -9.0)]
+        assert top[1]["url"] == "https://example.com/1"
+        assert [h["game_id"] for h in store.top_highlights(limit=20)] == ["game_3", "game_2", "game_1", "game_2"]
+
+        player = store.highlights_by_player("Иван Петров")
+        assert [(h["game_id"], h["event_time"]) for h in player] == [("game_1", "03:10"), ("game_2", "09:55")]
+
+
+def store_reuse_extractor(tmp_path, db_path, **kwargs):
+    """Sections-mode extractor with one fixed highlight at 30 s and a silent analysis WAV."""
+    # Sections mode reads the game duration from the analysis WAV, so no video is needed
+    extractor = HighlightExtractor("https://invalid.example/game", output_dir=str(tmp_path),
+                                   download_mode="sections", store_path=db_path, game_id="game_1", **kwargs)
+    write_wav(extractor.audio_path, np.zeros(11025 * 60), 11025)
+    extractor.highlight_timestamps = pd.DataFrame({
+        'time': [30.0], 'intensity': [-2.5], 'whistle_feature': [0.1]
+    })
+    return extractor
+
+
+def test_extractor_reuses_clips_recorded_in_store(tmp_path):
+    """Clips already in the store (and on disk) are reused, so no tool runs for them."""
+    db_path = str(tmp_path / "highlights.db")
+    existing_clip = tmp_path / "highlight_1_20240101_000000.mp4"
+    existing_clip.write_bytes(b"clip")
+
+    extractor = store_reuse_extractor(tmp_path, db_path)
+    try:
+        with HighlightStore(db_path) as store:
+            store.add_highlight("game_1", 30.0, 25.0, 35.0, intensity=-3.0, clip_path=str(existing_clip),
+                                encode_settings=extractor._encode_settings())
+
+        assert extractor.extract_highlights() == [str(existing_clip)]
+    finally:
+        extractor.cleanup()
+
+    with HighlightStore(db_path) as store:
+        (highlight,) = store.game_highlights("game_1")
+        assert highlight["intensity"] == -2.5
+        assert highlight["whistle_score"] == pytest.approx(0.1)
+        assert highlight["rank"] == 1
+
+
+def test_store_reuse_requires_matching_encode_settings(tmp_path):
+    """A clip cut with another encode profile, or without the ladder renditions, is cut again."""
+    db_path = str(tmp_path / "highlights.db")
+    existing_clip = tmp_path / "highlight_1_20240101_000000.mp4"
+    existing_clip.write_bytes(b"clip")
+
+    default = store_reuse_extractor(tmp_path, db_path)
+    with HighlightStore(db_path) as store:
+        store.add_highlight("game_1", 30.0, 25.0, 35.0, clip_path=str(existing_clip),
+                            encode_settings=default._encode_settings())
+    default.cleanup()
+
+    for kwargs in ({"encode_profile": "archival"}, {"ladder": True}):
+        extractor = store_reuse_extractor(tmp_path, db_path, **kwargs)
+        try:
+            extractor._open_store()
+            assert extractor._find_stored_clip(25.0, 35.0) is None
+        finally:
+            extractor.cleanup()
+
+    # A ladder clip is reused once it and all its renditions are on disk
+    ladder = store_reuse_extractor(tmp_path, db_path, ladder=True)
+    try:
+        with HighlightStore(db_path) as store:
+            store.add_highlight("game_1", 30.0, 25.0, 35.0, clip_path=str(existing_clip),
+                                encode_settings=ladder._encode_settings())
+        ladder._open_store()
+        assert ladder._find_stored_clip(25.0, 35.0) is None
+        for height in LADDER_HEIGHTS[1:]:
+            open(ladder._rendition_path(str(existing_clip), height), "wb").close()
+        assert ladder._find_stored_clip(25.0, 35.0) == str(existing_clip)
+    finally:
+        ladder.cleanup()
+
+
+def test_store_adds_encode_settings_to_older_databases(tmp_path):
+    """A database created before clips recorded their encode settings is migrated on open."""
+    db_path = str(tmp_path / "highlights.db")
+    schema = highlight_store.SCHEMA.replace("    encode_settings TEXT,\n", "")
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(schema)
+
+    with HighlightStore(db_path) as store:
+        store.add_highlight("game_1", 30.0, 25.0, 35.0, clip_path=str(tmp_path / "a.mp4"), encode_settings="x")
+        assert store.game_highlights("game_1")[0]["encode_settings"] == "x"
+
+
+def test_store_cli_lists_highlights_without_intensity(tmp_path, monkeypatch, capsys):
+    """Highlights recorded without an intensity are listed, not a crash."""
+    db_path = str(tmp_path / "highlights.db")
+    with HighlightStore(db_path) as store:
+        store.add_highlight("game_1", 30.0, 25.0, 35.0, clip_path="a.mp4")
+
+    monkeypatch.setattr("sys.argv", ["highlight_store.py", "--db", db_path, "top"])
+    assert highlight_store.main() == 0
+    assert "a.mp4" in capsys.readouterr().out
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Static file handler with byte-range support, like a CDN, that does not log every
+    request. The bytes sent per response are recorded in the server's `transfers` list.
+    """
+
+    def setup(self):
+        super().setup()
+        # A small send buffer, so bytes written to a client that hung up are not counted by the megabyte
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 16384)
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        self.send_header("Accept-Ranges", "bytes")
+        super().end_headers()
+
+    def send_head(self):
+        self.remaining = None
+        path = self.translate_path(self.path)
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if not match or not os.path.isfile(path):
+            return super().send_head()
+
+        size = os.path.getsize(path)
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        if start >= size:
+            self.send_error(416)
+            return None
+
+        f = open(path, "rb")
+        f.seek(start)
+        self.remaining = end - start + 1
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(self.remaining))
+        self.end_headers()
+        return f
+
+    def copyfile(self, source, outputfile):
+        sent = 0
+        try:
+            while self.remaining is None or sent < self.remaining:
+                chunk = source.read(65536 if self.remaining is None else min(65536, self.remaining - sent))
+                if not chunk:
+                    break
+                outputfile.write(chunk)
+                sent += len(chunk)
+        except ConnectionError:
+            # Seeking clients drop the connection once they have what they need
+            pass
+        finally:
+            self.server.transfers.append(sent)
+
+
+def media_duration(path):
+    """Duration of a media file in seconds, read from ffmpeg's banner."""
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True)
+    hours, minutes, seconds = re.search(r"Duration: (\d+):(\d+):([\d.]+)", result.stderr).groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def serve_synthetic_video(serve_dir, duration=120):
+    """
+    Write a synthetic game video (test pattern, tone with a loud burst at 30 s)
+    and serve it over HTTP.
+
+    Returns:
+        tuple: (server, url of the video)
+    """
+    os.makedirs(serve_dir, exist_ok=True)
+    subprocess.run([
+        "ffmpeg", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc=size=320x240:rate=25:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+        "-af", "volume='if(between(t,30,33),1,0.1)':eval=frame",
+        "-c:v", "mpeg4", "-g", "25", "-c:a", "aac", "-shortest", "-movflags", "+faststart",
+        os.path.join(serve_dir, "game.mp4")
+    ], check=True)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(RangeRequestHandler, directory=str(serve_dir)))
+    server.transfers = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/game.mp4"
+
+
+requires_media_tools = pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("yt-dlp")),
+                                          reason="requires ffmpeg and yt-dlp")
+
+
+def video_height(path):
+    """Frame height of a video file, read from ffmpeg's banner."""
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True)
+    return int(re.search(r"Video: .*?, (\d+)x(\d+)", result.stderr).group(2))
+
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="requires ffmpeg")
+def test_ladder_encodes_all_renditions_in_one_run(tmp_path):
+    """The ladder writes 1080p, 720p and 480p renditions of a clip from one ffmpeg invocation."""
+    source = str(tmp_path / "source.mp4")
+    subprocess.run([
+        "ffmpeg", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", "testsrc=size=1920x1080:rate=25:duration=4",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=4",
+        "-c:v", "mpeg4", "-c:a", "aac", "-shortest", source
+    ], check=True)
+
+    extractor = HighlightExtractor(source, output_dir=str(tmp_path), encode_profile="preview", ladder=True)
+    try:
+        clip_path = str(tmp_path / "highlight_1.mp4")
+        subprocess.run(extractor._encode_cmd(source, clip_path, 1.0, 2.0), check=True)
+
+        assert video_height(clip_path) == 1080
+        assert video_height(str(tmp_path / "highlight_1_720p.mp4")) == 720
+        assert video_height(str(tmp_path / "highlight_1_480p.mp4")) == 480
+        assert abs(media_duration(clip_path) - 2.0) < 0.5
+    finally:
+        extractor.cleanup()
+
+
+@requires_media_tools
+def test_sections_mode_downloads_only_highlight_ranges(tmp_path):
+    """Sections mode fetches just the highlight ranges, reading a fraction of the video over HTTP."""
+    server, url = serve_synthetic_video(tmp_path / "www")
+    video_size = os.path.getsize(tmp_path / "www" / "game.mp4")
+
+    extractor = HighlightExtractor(
+        url,
+        output_dir=str(tmp_path / "highlights"),
+        download_mode="sections"
+    )
+    try:
+        # Stand-in for an audio-only rendition: decode the analysis audio from the local file
+        extractor.analysis_path = str(tmp_path / "www" / "game.mp4")
+        assert extractor.extract_audio()
+        extractor.highlight_timestamps = pd.DataFrame({'time': [30.0, 90.0], 'intensity': [0.0, 0.0]})
+
+        clip_paths = extractor.extract_highlights()
+
+        assert len(clip_paths) == 2
+        for clip_path in clip_paths:
+            assert abs(media_duration(clip_path) - 10) < 1.0
+        # Two 10 s sections of a 120 s video, plus index reads: well under the whole file
+        assert sum(server.transfers) < video_size / 2
+    finally:
+        server.shutdown()
+        extractor.cleanup()
+
+
+@requires_media_tools
+def test_sections_mode_without_audio_rendition_downloads_once(tmp_path):
+    """A single-file source has no audio-only rendition; it is downloaded once and cut locally."""
+    server, url = serve_synthetic_video(tmp_path / "www")
+    video_size = os.path.getsize(tmp_path / "www" / "game.mp4")
+
+    extractor = HighlightExtractor(
+        url,
+        output_dir=str(tmp_path / "highlights"),
+        download_mode="sections"
+    )
+    try:
+        assert extractor.download_video()
+        assert extractor.sections_fallback
+        assert extractor.analysis_path == extractor.video_path
+        assert extractor.extract_audio()
+        downloaded = sum(server.transfers)
+        assert downloaded < video_size * 1.2
+
+        extractor.highlight_timestamps = pd.DataFrame({'time': [30.0, 90.0], 'intensity': [0.0, 0.0]})
+        clip_paths = extractor.extract_highlights()
+
+        assert len(clip_paths) == 2
+        for clip_path in clip_paths:
+            assert abs(media_duration(clip_path) - 10) < 1.0
+        assert sum(server.transfers) == downloaded
+    finally:
+        server.shutdown()
+        extractor.cleanup()
+
+
+def test_checkpoints_follow_settings_and_survive_failures(tmp_path):
+    """Checkpoints are only reused with matching settings, and a failed run keeps the work dir."""
+    work_dir = str(tmp_path / "work")
+    kwargs = dict(output_dir=str(tmp_path / "highlights"), download_mode="sections", work_dir=work_dir)
+
+    extractor = HighlightExtractor("https://invalid.example/game", **kwargs)
+    open(extractor.analysis_path, "wb").close()
+    write_wav(extractor.audio_path, np.zeros(11025), 11025)
+    extractor._mark_stage_done("download")
+    extractor._mark_stage_done("audio")
+    extractor.highlight_timestamps = pd.DataFrame({'time': [30.0], 'intensity': [-2.5], 'whistle_feature': [0.1]})
+    extractor._mark_stage_done("analysis", **extractor._checkpoint_data("analysis"))
+
+    resumed = HighlightExtractor("https://invalid.example/game", **kwargs)
+    assert resumed._resume_stage("download") and resumed._resume_stage("audio")
+    assert resumed._resume_stage("analysis")
+    assert resumed.highlight_timestamps['time'].tolist() == [30.0]
+
+    # Different settings invalidate the analysis, but not the download and audio before it
+    changed = HighlightExtractor("https://invalid.example/game", num_highlights=3, **kwargs)
+    assert changed._stage_done("download") and changed._stage_done("audio")
+    assert not changed._stage_done("analysis")
+
+    # Redoing a stage drops the checkpoints computed from its old results
+    changed._mark_stage_done("audio")
+    assert "analysis" not in changed.checkpoints
+
+    # A failing run (here: no usable analysis) keeps the work directory and its checkpoints
+    os.remove(changed.audio_path)
+    assert not changed.run()
+    assert os.path.exists(os.path.join(work_dir, "checkpoints.json"))
+    assert os.path.exists(changed.analysis_path)
+
+
+def test_cleanup_keeps_user_files_in_work_dir(tmp_path):
+    """Cleanup removes only pipeline files from an existing work dir, and never the dir itself."""
+    work_dir = tmp_path / "work"
+    (work_dir / "notes").mkdir(parents=True)
+    (work_dir / "precious.txt").write_text("keep me")
+    (work_dir / "notes" / "game.txt").write_text("keep me too")
+
+    extractor = HighlightExtractor("https://invalid.example/game", output_dir=str(tmp_path / "highlights"),
+                                   download_mode="sections", work_dir=str(work_dir))
+    write_wav(extractor.audio_path, np.zeros(11025), 11025)
+    open(extractor.analysis_path, "wb").close()
+    for name in ("analysis_media.part", "video.f137.mp4.part", "section.temp.mp4", "video.final.mov"):
+        open(str(work_dir / name), "wb").close()
+    extractor._mark_stage_done("audio")
+    extractor.cleanup()
+
+    assert sorted(os.listdir(work_dir)) == ["notes", "precious.txt", "video.final.mov"]
+    assert (work_dir / "notes" / "game.txt").read_text() == "keep me too"
+
+
+def test_cleanup_keeps_existing_empty_work_dir(tmp_path):
+    """Only a work dir the pipeline created itself is removed, even if nothing else is in it."""
+    existing, created = tmp_path / "existing", tmp_path / "created"
+    existing.mkdir()
+    for work_dir in (existing, created):
+        extractor = HighlightExtractor("https://invalid.example/game", output_dir=str(tmp_path / "highlights"),
+                                       work_dir=str(work_dir))
+        extractor._mark_stage_done("download")
+        extractor.cleanup()
+
+    assert os.listdir(existing) == []
+    assert not os.path.exists(created)
+
+
+@requires_media_tools
+@pytest.mark.parametrize("download_mode", ["full", "sections"])
+def test_changed_url_redownloads_into_kept_work_dir(tmp_path, download_mode):
+    """Media left in a kept work dir by another game is replaced, not reused."""
+    short_server, short_url = serve_synthetic_video(tmp_path / "short", duration=60)
+    long_server, long_url = serve_synthetic_video(tmp_path / "long", duration=150)
+    kwargs = dict(output_dir=str(tmp_path / "highlights"), download_mode=download_mode,
+                  work_dir=str(tmp_path / "work"))
+    durations = []
+
+    def failing_analysis(extractor):
+        with wave.open(extractor.audio_path) as wav:
+            durations.append(wav.getnframes() / wav.getframerate())
+        return False
+
+    try:
+        for url in (short_url, long_url):
+            extractor = HighlightExtractor(url, **kwargs)
+            extractor.analyze_audio = functools.partial(failing_analysis, extractor)
+            assert not extractor.run(compile_clips=False)
+    finally:
+        short_server.shutdown()
+        long_server.shutdown()
+
+    assert abs(durations[0] - 60) < 1 and abs(durations[1] - 150) < 1
+
+
+def test_output_dir_inside_work_dir_is_refused(tmp_path):
+    """An output directory inside the work directory would be at risk from cleanup."""
+    for output_dir in (tmp_path / "work" / "highlights", tmp_path / "work"):
+        with pytest.raises(ValueError):
+            HighlightExtractor("https://invalid.example/game", output_dir=str(output_dir),
+                               work_dir=str(tmp_path / "work"))
+    # A sibling whose name merely starts with the work dir's is fine
+    HighlightExtractor("https://invalid.example/game", output_dir=str(tmp_path / "work_highlights"),
+                       work_dir=str(tmp_path / "work")).cleanup()
+
+
+@requires_media_tools
+def test_rerun_resumes_and_only_cuts_missing_clips(tmp_path):
+    """After a failure at the second clip, a rerun skips download, audio and analysis and cuts only that clip."""
+    server, url = serve_synthetic_video(tmp_path / "www", duration=150)
+    kwargs = dict(num_highlights=2, output_dir=str(tmp_path / "highlights"), download_mode="sections",
+                  work_dir=str(tmp_path / "work"))
+
+    try:
+        first = HighlightExtractor(url, **kwargs)
+
+        # Fixed highlights, one in each half of the game; the second clip's command fails
+        def analyze():
+            first.highlight_timestamps = pd.DataFrame({
+                'time': [30.0, 100.0], 'intensity': [0.0, -1.0], 'whistle_feature': [0.0, 0.0]
+            })
+            return True
+        first.analyze_audio = analyze
+        clip_cmds = first._clip_cmds
+        first._clip_cmds = lambda start, end, path: [["false"]] if start > 60 else clip_cmds(start, end, path)
+
+        assert first.run(compile_clips=False)
+        assert first.failed_clips == [2]
+        assert os.path.exists(first.audio_path)
+        first_clip, second_clip = [path for _, _, _, path in first._clip_plan(None)]
+        first_clip_mtime = os.path.getmtime(first_clip)
+
+        second = HighlightExtractor(url, **kwargs)
+        for step in ("download_video", "extract_audio", "analyze_audio"):
+            setattr(second, step, lambda step=step: pytest.fail(f"{step} should be resumed from its checkpoint"))
+        assert second.run(compile_clips=False)
+
+        assert not second.failed_clips
+        assert os.path.getmtime(first_clip) == first_clip_mtime
+        assert abs(media_duration(second_clip) - 10) < 1.0
+        # The completed run removes its work directory
+        assert not os.path.exists(kwargs["work_dir"])
+    finally:
+        server.shutdown()
+
+
+def process_is_gone(pid):
+    """True if the process no longer runs (exited, or a zombie waiting to be reaped)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            return any(line.startswith("State:") and "Z" in line for line in status)
+    except FileNotFoundError:
+        return True
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="requires /proc to inspect processes")
+def test_async_cancellation_kills_child_processes(tmp_path):
+    """Cancelling a running command kills the child and the processes it spawned."""
+    pid_file = tmp_path / "grandchild.pid"
+    extractor = AsyncHighlightExtractor("synthetic", output_dir=str(tmp_path / "highlights"))
+
+    async def cancel_running_command():
+        task = asyncio.create_task(extractor._run_command(
+            ["sh", "-c", f"sleep 60 & echo $! > {pid_file}; wait"]
+        ))
+        while not pid_file.exists() or not pid_file.read_text().strip():
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(cancel_running_command())
+        assert process_is_gone(int(pid_file.read_text()))
+    finally:
+        extractor.cleanup()
+
+
+def test_async_stages_can_be_awaited_without_run(tmp_path):
+    """Single stages work outside run(); their messages go to the base logger instead of events."""
+    audio_path = str(tmp_path / "game.wav")
+    write_synthetic_game(audio_path, duration=300)
+    extractor = AsyncHighlightExtractor("synthetic", num_highlights=2, output_dir=str(tmp_path / "highlights"))
+
+    async def run_stages():
+        extractor.audio_path = audio_path
+        assert await extractor.analyze_audio()
+        assert await extractor._run_stage("check", ["true"], "Running a command") is not None
+        assert await extractor._run_stage("check", ["false"], "Running a failing command") is None
+
+    try:
+        asyncio.run(run_stages())
+        assert len(extractor.highlight_timestamps) == 2
+    finally:
+        extractor.cleanup()
+
+
+@requires_media_tools
+def test_async_pipeline_runs_games_concurrently(tmp_path):
+    """Two games run concurrently on one event loop, reporting progress as events."""
+    server, url = serve_synthetic_video(tmp_path / "www", duration=90)
+
+    async def run_game(name):
+        extractor = AsyncHighlightExtractor(url, num_highlights=1, output_dir=str(tmp_path / name),
+                                            download_mode="sections")
+        task = asyncio.create_task(extractor.run())
+        events = [event async for event in extractor.events()]
+        return await task, events, extractor.highlight_timestamps
+
+    async def run_games():
+        return await asyncio.gather(run_game("game_1"), run_game("game_2"))
+
+    try:
+        for success, events, highlights in asyncio.run(run_games()):
+            assert success
+            assert [e["stage"] for e in events if e["status"] == "completed"] == [
+                "download", "extract_audio", "analyze", "extract_highlights", "compile"
+            ]
+            assert events[-1] == {"stage": "run", "status": "finished", "message": None, "success": True}
+            assert abs(highlights['time'].iloc[0] - 30) < 4
+    finally:
+        server.shutdown()
@@ -0,0 +1,201 @@
+"""
+Tests for the basketball.bg scrapers, run against saved HTML fixtures.
+
+A fake session serves the fixtures by URL and counts the requests, so the tests
+also check that the scrapers share one fetch and one parse per page.
+"""
+
+import json
+import os
+
+import pytest
+
+from event_store import COLUMNS, EventStore, dict_events_nbytes, parse_action
+from fetcher import GAME_PAGE_URL, GameFetcher
+from scraper import GameScraper
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+GAME_ID = "374043"
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Serves fixture files instead of basketball.bg pages."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, timeout=None):
+        self.requested.append(url)
+        with open(os.path.join(FIXTURES_DIR, self.pages[url]), encoding="utf-8") as f:
+            return FakeResponse(f.read())
+
+
+def fixture_fetcher():
+    session = FakeSession({
+        f"https://comps.basketball.bg/game_play.inc.php?g_id={GAME_ID}": "game_play.html",
+        GAME_PAGE_URL.format(game_id=GAME_ID): "game_page.html",
+    })
+    return GameFetcher(session=session), session
+
+
+def test_game_scraper_fetches_and_parses_each_page_once():
+    fetcher, session = fixture_fetcher()
+    data = GameScraper(GAME_ID, fetcher).scrape()
+
+    assert len(session.requested) == 2
+    assert fetcher.request_count == 2
+    assert fetcher.parse_count == 2
+    # The finished game's pages are not kept by the shared fetcher
+    assert not fetcher._soups
+
+    assert [event["quarter"] for event in data["play_by_play"]] == ["Q1", "Q1", "Q2"]
+    assert data["play_by_play"][2]["player_name"] == "Дзен Дай"
+    assert (data["play_by_play"][2]["home_score"], data["play_by_play"][2]["away_score"]) == (14, 17)
+
+
+def test_fetcher_keeps_only_recent_parsed_pages():
+    """Only the most recently used documents are kept; raw HTML is never cached."""
+    fetcher, session = fixture_fetcher()
+    fetcher.max_cached_pages = 1
+    play_url = f"https://comps.basketball.bg/game_play.inc.php?g_id={GAME_ID}"
+    game_url = GAME_PAGE_URL.format(game_id=GAME_ID)
+
+    fetcher.fetch_soup(play_url)
+    fetcher.fetch_soup(play_url)
+    assert fetcher.request_count == 1
+    fetcher.fetch_html(play_url)
+    assert fetcher.request_count == 2
+
+    fetcher.fetch_soup(game_url)
+    assert list(fetcher._soups) == [game_url]
+    fetcher.fetch_soup(play_url)
+    assert fetcher.request_count == 4
+
+    with pytest.raises(ValueError):
+        GameFetcher(max_cached_pages=0)
+
+
+def test_box_score_parses_players():
+    fetcher, _ = fixture_fetcher()
+    box_score = GameScraper(GAME_ID, fetcher).box_score.scrape()
+
+    assert box_score["home"]["name"] == "Етрос"
+    assert box_score["away"]["name"] == "Дрийм тийм Троян"
+    assert len(box_score["home"]["players"]) == 1
+    assert len(box_score["away"]["players"]) == 1
+
+    mangov = box_score["home"]["players"][0]
+    assert mangov["name"] == "Д. Мангов"
+    assert mangov["starter"] and mangov["captain"]
+    assert mangov["position"] == "PF"
+    assert mangov["minutes"] == "18:13"
+    assert (mangov["number"], mangov["points"], mangov["fg_made"], mangov["fg_attempted"]) == (9, 4, 2, 4)
+    assert mangov["plus_minus"] == -10
+    assert mangov["efficiency"] == 9
+
+    dai = box_score["away"]["players"][0]
+    assert not dai["starter"] and not dai["captain"]
+    assert (dai["three_made"], dai["three_attempted"], dai["three_percentage"]) == (3, 5, 60)
+
+
+def test_shot_chart_parses_shots_and_totals():
+    fetcher, _ = fixture_fetcher()
+    shot_chart = GameScraper(GAME_ID, fetcher).shot_chart
+    shots = shot_chart.scrape()
+
+    assert [shot["made"] for shot in shots] == [True, False, True]
+    assert [shot["period"] for shot in shots] == ["Q1", "Q2", "OT"]
+    assert [shot["team"] for shot in shots] == ["home", "away", "away"]
+    assert shots[0]["player_number"] == 9
+    assert shots[0]["player_name"] == "Д. Мангов"
+    assert shots[0]["shot_type"] == "2pt jump shot"
+    assert shots[1]["player_index"] == 6
+    assert (shots[1]["x"], shots[1]["y"]) == (55.1, 80.2)
+
+    assert shot_chart.totals["home"]["fg_attempted"] == 69
+    assert shot_chart.totals["away"]["fg_percentage"] == 41
+    assert shot_chart.totals["away"]["ft_made"] is None
+
+
+def test_event_store_round_trip_and_filters():
+    fetcher, _ = fixture_fetcher()
+    events = GameScraper(GAME_ID, fetcher).play_by_play.scrape()
+
+    store = EventStore()
+    store.add_game(GAME_ID, events)
+    store.add_game("other", events)
+
+    assert len(store) == 6
+    assert len(store.players) == 2
+
+    decoded = store.event(2)
+    assert decoded["quarter"] == "Q2"
+    assert decoded["time"] == "05:03"
+    assert decoded["team"] == "away"
+    assert decoded["player_name"] == "Дзен Дай"
+    assert decoded["action"] == "3pt jump shot made"
+    assert (decoded["home_score"], decoded["away_score"]) == (14, 17)
+    assert store.event(1)["home_score"] is None
+
+    assert store.filter(player="Дзен Дай") == [1, 2, 4, 5]
+    assert store.filter(game="other", player="Дзен Дай", period="Q2") == [5]
+    assert store.filter(action="defensive rebound", team="away") == [1, 4]
+    assert store.filter(player="Дзен Дай", action="3pt jump shot made") == [2, 5]
+    assert store.filter(player="nobody") == []
+    assert store.filter(game="missing") == []
+
+
+def test_event_store_rejects_malformed_game_without_changes():
+    """A malformed event fails the whole game and leaves the store and later games aligned."""
+    fetcher, _ = fixture_fetcher()
+    events = GameScraper(GAME_ID, fetcher).play_by_play.scrape()
+
+    store = EventStore()
+    store.add_game("first", events)
+
+    for bad_field, bad_value in (("team", "neutral"), ("time", "5m03s"), ("time", "9999:00")):
+        bad_game = [dict(event) for event in events]
+        bad_game[1][bad_field] = bad_value
+        with pytest.raises((ValueError, OverflowError)):
+            store.add_game("bad", bad_game)
+
+    assert len({len(getattr(store, name)) for name in COLUMNS}) == 1
+    assert len(store) == 3
+    assert store.filter(game="bad") == []
+
+    store.add_game("second", events)
+    assert store.filter(game="second") == [3, 4, 5]
+    assert store.event(5)["player_name"] == "Дзен Дай"
+    assert store.event(5)["game_id"] == "second"
+    assert store.filter(player="Дзен Дай") == [1, 2, 4, 5]
+
+
+def test_event_store_is_smaller_than_event_dicts():
+    fetcher, _ = fixture_fetcher()
+    events = GameScraper(GAME_ID, fetcher).play_by_play.scrape()
+
+    # Separate copies per game, like separate scrapes
+    season = [json.loads(json.dumps(events)) for _ in range(100)]
+    store = EventStore()
+    for game_number, game_events in enumerate(season):
+        store.add_game(str(game_number), game_events)
+
+    all_events = [event for game_events in season for event in game_events]
+    assert store.nbytes() * 10 < dict_events_nbytes(all_events)
+
+
+def test_parse_action_splits_player_points():
+    html = ('<div class="div_info">\n<a class="player_name" href="player-1">Иван Петров</a>'
+            '2 стрелба тип флоутър<br/>успешен (5 точки)</div>')
+    assert parse_action(html) == ("2 стрелба тип флоутър успешен", 5)
+    assert parse_action('<div class="div_info">Таймаут</div>') == ("Таймаут", None)